@@ -1,31 +1,142 @@
 # Standard library.
 from copy import copy, deepcopy
 from collections import OrderedDict
+from itertools import chain, compress, islice, izip, product
+from functools import partial
+import heapq
 import json
-from numbers import Number
+import operator
+from numbers import Integral, Number
+from weakref import WeakValueDictionary
 # Utils.
-from utils import dynamicTyped, parse
+from utils import dynamicTyped, iterParse, lineParser, _IMMUTABLE, _copyValue, _copyList
+from expressions import isExpression, parseExpression
+from vectorized import Vectorized, maskAnd, maskIndices, maskOr, valueMask, expressionMask, _BOOLS
+from indexes import HashIndex, SortedIndex, SortOrder, _hashable, _hasNaN
+from stats import ColumnStats
+import binary
+import parallel
+import reader
+from writer import Writer, formatColumns, formatRows, roundValues, writeJson
+from query import Query
+from groupby import GroupBy
 
 '''
 To Do:
 	-fix .addColumn behaviour that does not let add new columns of different length than current grid length.
 '''
 
+class Schema(object):
+	'''
+	Immutable header (ordered field names) shared by a Grid and all of its GridRows.
+	Schemas are interned, so Grids and GridRows with equal headers share the same Schema object. Header changes never modify
+	a Schema, a new one is returned instead (see append, remove, move and rename), so they cost O(columns) no matter how many
+	rows use it.
+
+	To be used by Grid and GridRow, do not instantiate directly (use Schema.intern).
+	'''
+	__slots__ = ('fields','fieldIndex','__weakref__')
+	_interned = WeakValueDictionary()
+
+	def __init__(self,fields):
+		self.fields = tuple(fields)
+		# create dict matching each field with its column index
+		self.fieldIndex = dict([(item,i) for i,item in enumerate(self.fields)])
+
+	@classmethod
+	def intern(cls,fields):
+		'''
+		Return the shared Schema for given fields, creating it if needed.
+		Fields can be given as a list, tuple or Schema.
+		'''
+		if isinstance(fields,Schema):
+			return fields
+		fields = tuple(fields)
+		# field types are part of the key so that e.g. 1 and 1.0 headers are not mixed up.
+		key = (fields,tuple([type(field) for field in fields]))
+		schema = cls._interned.get(key)
+		if schema is None:
+			schema = cls(fields)
+			cls._interned[key] = schema
+		return schema
+
+	def __len__(self):
+		return len(self.fields)
+
+	def __iter__(self):
+		return self.fields.__iter__()
+
+	def __repr__(self):
+		return 'Schema('+', '.join([str(field) for field in self.fields])+')'
+
+	def index(self,field):
+		'''
+		Return position of the first field with given name.
+		'''
+		return self.fields.index(field)
+
+	def append(self,field):
+		'''
+		Return new Schema with field added at the end.
+		'''
+		return Schema.intern(self.fields+(field,))
+
+	def remove(self,index):
+		'''
+		Return new Schema without field at given position.
+		'''
+		return Schema.intern(self.fields[:index]+self.fields[index+1:])
+
+	def move(self,index,newIndex):
+		'''
+		Return new Schema with field at given position moved to newIndex.
+		'''
+		fields = list(self.fields)
+		fields.insert(newIndex,fields.pop(index))
+		return Schema.intern(fields)
+
+	def rename(self,index,newName):
+		'''
+		Return new Schema with field at given position renamed.
+		'''
+		return Schema.intern(self.fields[:index]+(newName,)+self.fields[index+1:])
+
 class GridRow(object):
 	'''
 	Abstract list-like object of which Grid objects are made of.
 	This object is similar to an ordered dict, but with some modified builtins, few extra methods and a safe immutable design.
-	
+
 	To be used by Grid, do not instiantate directly.
-	
-	GridRow is designed with safety in mind so it is inmutable form outside. Hence, all objects that are given as arguments or returned
-	by gridrow methods are deepcopied.
+
+	GridRow is designed with safety in mind so it is inmutable form outside. Hence, all mutable objects (e.g. lists) that are given as
+	arguments or returned by gridrow methods are deepcopied, immutable ones (numbers, strings, None) are shared. Row views of a Grid
+	with zeroCopy set to True return mutable values without copying them.
+
+	A GridRow is either standalone (it owns its elements and header) or a view of one row of a Grid (it only keeps a reference to the
+	Grid and the row index, values are read from and written to Grid column storage). Changing the fields of a view (adding, popping
+	or moving fields, or setting a new header) detaches it from its Grid first, so Grid columns are never modified that way.
+	Row views are not updated when rows are added or removed from their Grid, get a new one when needed.
+	Header is kept as a Schema shared with the Grid (views) or with other GridRows with the same header.
 	'''
+	__slots__ = ('_grid','_row','_elements','_schema')
+
 	def __init__(self,elements,header):
-		self._elements = deepcopy(elements)
-		self._header = deepcopy(header)
-		# create dict matching each field with its column index
-		self._fieldIndexDict = dict([(item,i) for i,item in enumerate(self._header)])
+		self._grid = None
+		self._row = None
+		self._elements = _copyList(elements)
+		self._schema = Schema.intern(header)
+
+	@classmethod
+	def _view(cls,grid,row):
+		'''
+		Create a GridRow that reads its values from row number "row" of the grid columns.
+		'''
+		gridRow = cls.__new__(cls)
+		gridRow._grid = grid
+		gridRow._row = row
+		gridRow._elements = None
+		gridRow._schema = None
+		return gridRow
 
 	# Properties
 
@@ -35,15 +146,15 @@ class GridRow(object):
 		Return gridrow header.
 		A copy is returned so that actual gridrow header is not modified by accident.
 		'''
-		return deepcopy(self._header) # 
+		return list(self._fields())
 
 	@header.setter
 	def header(self, newHeader):
 		'''
-		Header setter updates header and fieldIndex dict.
+		Header setter updates header schema.
 		'''
-		self._header = deepcopy(newHeader) # copy given header so that it is not modified from outside gridrow by accident.
-		self._fieldIndexDict = dict([(item,i) for i,item in enumerate(self._header)])
+		self._detach()
+		self._schema = Schema.intern(newHeader)
 
 	@property
 	def elements(self):
@@ -51,15 +162,18 @@ class GridRow(object):
 		Return gridrow elements.
 		A copy is returned so that actual gridrow elements are not modified by accident.
 		'''
-		return deepcopy(self._elements)
+		if self._zeroCopy():
+			return self._values()
+		return _copyList(self._values())
 
 	@elements.setter
 	def elements(self,newElements):
 		'''
 		Set all elements to new values.
 		'''
-		if len(newElements) == len(self._elements):
-			self._elements = deepcopy(newElements)
+		if len(newElements) == len(self):
+			for i,element in enumerate(newElements):
+				self._set(i,_copyValue(element))
 		else:
 			raise IndexError('ERROR: [Grid|elements.setter]: New elements differ in length from current elements')
 
@@ -71,7 +185,9 @@ class GridRow(object):
 		Field can be specified by column index or header name.
 		'''
 		fieldIndex = self._fieldIndex(field)
-		return deepcopy(self._elements[fieldIndex])
+		if self._zeroCopy():
+			return self._get(fieldIndex)
+		return _copyValue(self._get(fieldIndex))
 
 	def __setitem__(self,field,value):
 		'''
@@ -84,23 +200,22 @@ class GridRow(object):
 		# field name given
 		if type(field) == str:
 			# field exists, lookup index
-			if field in self._fieldIndexDict.keys():
-				fieldIndex = self._fieldIndexDict[field]
-			# field does not exist, set index to current last field + 1 
+			if field in self._getSchema().fieldIndex:
+				fieldIndex = self._getSchema().fieldIndex[field]
+			# field does not exist, set index to current last field + 1
 			else:
-				fieldIndex = len(self.header)
+				fieldIndex = len(self)
 		# field index given
 		else:
 			fieldIndex = field
 		# element exists
-		if fieldIndex < len(self.header):
-			self._elements[fieldIndex] = deepcopy(value)
+		if fieldIndex < len(self):
+			self._set(fieldIndex,_copyValue(value))
 		# add new element
-		elif fieldIndex == len(self.header):
-			self._elements.append(deepcopy(value))
-			newHeader = self.header
-			newHeader.append(field)
-			self.header = newHeader
+		elif fieldIndex == len(self):
+			self._detach()
+			self._elements.append(_copyValue(value))
+			self._schema = self._schema.append(field)
 		else:
 			raise IndexError('[Grid|__setitem__]: GridRow does not have index field '+str(fieldIndex))
 
@@ -108,7 +223,7 @@ class GridRow(object):
 		'''
 		Treat GridRow as a list of elements.
 		'''
-		return ', '.join([str(element) for element in self._elements])
+		return ', '.join([str(element) for element in self._values()])
 
 	def __eq__(self,other):
 		'''
@@ -116,14 +231,14 @@ class GridRow(object):
 		'''
 		if isinstance(other,GridRow):
 			if len(self) == len(other):
-				for i,element in enumerate(self.elements):
-					if element != other[i]:
+				for i,element in enumerate(self._values()):
+					if element != other._get(i):
 						return False
 			else:
 				return False
 			return True
 		elif isinstance(other,list):
-			if self.elements == other:
+			if self._values() == other:
 				return True
 			else:
 				return False
@@ -136,40 +251,120 @@ class GridRow(object):
 		'''
 		return not self.__eq__(other)
 
+	def __hash__(self):
+		'''
+		GridRows are hashed by their elements (as they are compared), so that equal rows can be found in sets and dicts.
+		Do not modify a GridRow while it is used as a key.
+		'''
+		return hash(_hashable(tuple(self._values())))
+
 	def __iter__(self):
 		'''
 		Gridrow is treated as a list of elements.
 		'''
-		return self._elements.__iter__()
+		return self._values().__iter__()
 
 	def __len__(self):
 		'''
 		Gridrow is treated as a list of elements.
 		'''
-		return len(self._elements)
+		return len(self._fields())
+
+	def __deepcopy__(self,memo):
+		'''
+		Copies are always standalone GridRows, even when copying a row view.
+		'''
+		return self._copy()
+
+	def __reduce__(self):
+		'''
+		Pickle GridRows (e.g. to send them to other processes) as standalone rows with their values and header.
+		'''
+		return (GridRow,(self._values(),list(self._fields())))
 
 	# Private
 
+	def _copy(self):
+		'''
+		Return a standalone copy of GridRow.
+		'''
+		return GridRow(self._values(),self._getSchema())
+
+	def _zeroCopy(self):
+		'''
+		Return True if values can be returned without copying them (row views of a Grid with zeroCopy set).
+		'''
+		return self._grid is not None and self._grid.zeroCopy
+
+	def _getSchema(self):
+		'''
+		Return header schema (Grid schema for row views).
+		'''
+		if self._grid is None:
+			return self._schema
+		return self._grid._schema
+
+	def _fields(self):
+		'''
+		Return header fields tuple.
+		'''
+		return self._getSchema().fields
+
 	def _fieldIndex(self,field):
 		'''
 		Return field position based on its name.
 		'''
 		if type(field) == str:
-			return self._fieldIndexDict[field]
+			return self._getSchema().fieldIndex[field]
 		else:
 			return field
 
+	def _values(self):
+		'''
+		Return elements without copying them.
+		'''
+		if self._grid is None:
+			return self._elements
+		return [column[self._row] for column in self._grid._columns]
+
+	def _get(self,fieldIndex):
+		'''
+		Return element at given column index without copying it.
+		'''
+		if self._grid is None:
+			return self._elements[fieldIndex]
+		return self._grid._columns[fieldIndex][self._row]
+
+	def _set(self,fieldIndex,value):
+		'''
+		Set element at given column index (row views write to Grid columns).
+		'''
+		if self._grid is None:
+			self._elements[fieldIndex] = value
+		else:
+			self._grid._writableColumn(fieldIndex)[self._row] = value
+			self._grid._invalidateIndexes([fieldIndex])
+
+	def _detach(self):
+		'''
+		Turn a row view into a standalone GridRow with its own copy of elements and header.
+		'''
+		if self._grid is not None:
+			self._elements = _copyList(self._values())
+			self._schema = self._grid._schema
+			self._grid = None
+			self._row = None
+
 	# Public
 
 	def pop(self,field):
 		'''
 		Delete element and corresponding header entry.
 		'''
-		index = self.header.index(field)
+		self._detach()
+		index = self._schema.index(field)
 		element = self._elements.pop(index)
-		newHeader = self.header
-		newHeader.pop(index)
-		self.header = newHeader
+		self._schema = self._schema.remove(index)
 		return element
 
 	def keys(self):
@@ -190,20 +385,20 @@ class GridRow(object):
 		'''
 		Return the index of an element.
 		'''
-		return self._elements.index(element)
+		return self._values().index(element)
 
 	def round(self,precision):
 		'''
 		Return a copy of GridRow with numeric elements rounded to specified precision.
 		'''
 		rounded = []
-		for element in self._elements:
+		for element in self._values():
 			# check if element is a number (note that True/False are also Numbers in python so a second check is added)
 			if isinstance(element, Number) and not isinstance(element, bool):
 				rounded.append(round(element,precision))
 			else:
 				rounded.append(element)
-		return GridRow(rounded,self.header)
+		return GridRow(rounded,self._getSchema())
 
 	def asDict(self):
 		'''
@@ -234,24 +429,22 @@ class GridRow(object):
 			field (str): Name of field to move.
 			newIndex (int): New field position.
 		'''
+		self._detach()
 		# get current index
 		currentIndex = self._fieldIndex(field)
-		# check if new position is last element to choose between append or insert.
-		if newIndex < len(self.header)-1:
-			# move elements
-			self._elements.insert(newIndex, self._elements.pop(currentIndex))
-			# update header
-			self._header.insert(newIndex, self._header.pop(currentIndex))
-		elif newIndex == len(self.header):
-			self._elements.append(self._elements.pop(currentIndex))
-			self._header.append(self._header.pop(currentIndex))
-		else:
+		if newIndex > len(self):
 			raise IndexError('ERROR [Grid|moveField]: Cannot move field to a position greater than GridRow length')
+		# move elements
+		self._elements.insert(newIndex, self._elements.pop(currentIndex))
+		# update header
+		self._schema = self._schema.move(currentIndex,newIndex)
 
 class Grid(object):
 	'''
 	Class for 2D grid analysis and manipulation.
-	Each row in Grid is a GridRow object.
+	Grid data is stored by columns (one list per field). Rows are accessed as GridRow views of the columns.
+	Columns are copy-on-write: copies and column projections of a Grid share its columns until one of them modifies them.
+	Reads only copy mutable values (e.g. lists), set zeroCopy to True to skip that too in trusted code that does not modify them.
 	Structure:
 		header 1,	header 2,	header 3,	...,	header N 	(fields === columns)
 		r1c1,		r1c2,		r1c3,		...,	r1cN		(row)
@@ -262,32 +455,37 @@ class Grid(object):
 
 	# built-ins
 
-	def __init__(self,grid,header=True,**kwargs):
+	def __init__(self,grid,header=True,workers=1,**kwargs):
 		'''
 		[Arguments]
 			grid (str/list[list[misc]]): Path to file containing grid or grid given directly as a list of lists.
 			header (list[str]/bool): Set to True when header is given on first grid row.
 										Set to False when grid has no header ('col1', 'col2', ..., 'colN' header names will be given).
 										Set to list of strings to use as header. List length must match number grid columns.
-			**kwargs (dict): Kwargs passed to _parse() method in charge of parsing grid from a file.
-		'''
-		# path to grid given. Read file and parse.
-		if type(grid) == str:
-			with open(grid,'r') as f: grid = f.readlines()
-			self.grid = parse(grid,**kwargs)
-		# grid given as a list of lists. Grid is assigned to gridrows directly.
+			*workers (int): Number of processes parsing the file in parallel (see parallel module).
+			**kwargs (dict): Kwargs passed to utils.iterParse() function in charge of parsing grid from a file.
+		'''
+		self._initState()
+		# path to grid given, split into byte ranges parsed by a pool of processes.
+		if type(grid) == str and workers > 1:
+			self._parseParallel(grid,header,workers,kwargs)
+		# path to grid given. Stream file lines through the parser into the columns.
+		elif type(grid) == str:
+			with open(grid,'r') as f:
+				rows = iterParse(f,**kwargs)
+				firstRows = list(islice(rows,2))
+				self._initHeader(header,firstRows)
+				self._columns = self._asColumns(firstRows)
+				self._extendColumns(rows)
+		# grid given as a list of lists. Rows are copied into columns.
 		elif isinstance(grid,list):
-			self.grid = grid
+			rows = list(grid)
+			self._initHeader(header,rows)
+			self._columns = self._asColumns(rows)
 		else:
 			raise TypeError('ERROR [pyDSO.Grid]: Unkown grid format.')
-		# initialize header
-		self._initHeader(header)
-		# create grid as a list of GridRows
-		self.grid = [GridRow(row,self.header) for row in self.grid]
 		# remove None header fields
 		self.removeColumn([columnIndex for columnIndex,column in enumerate(self.header) if column == None])
-		# default settings
-		self.defaultFilterRule = 'OR'
 
 	def __add__(self,newRow,fill_value=None):
 		'''
@@ -313,29 +511,26 @@ class Grid(object):
 			index (slice[int]): Row indices slice -> return Grid containing such GridRows.
 			index (slice[str]): Field names slice -> return Grid containing such columns.
 			index (callable): Function f(gridrow) = value -> return list with all modified field values.
-			->return (list/GridRow/Grid): List with all field values, GridRow or Grid, depending on index type. 
+			->return (list/GridRow/Grid): List with all field values, GridRow or Grid, depending on index type.
 		'''
 		if type(index) == str:
 			return self._field(index)
 		elif type(index) == int:
-			return self.grid[index]
+			return self.row(index)
 		elif type(index) == dict:
 			return self.filter(index)
 		elif isinstance(index,list):
 			if type(index[0]) == int:
-				return Grid([self.grid[e].elements for e in index],header=self.header)
+				return self._take(index)
 			elif type(index[0]) == str:
-				newGrid = map(list, zip(*[self[field] for field in index])) 
-				return Grid(newGrid,header=index)
+				return self.select(index)
 			elif type(index[0]) == dict:
 				return self.filter(index)
 		elif type(index) == slice:
 			if type(index.start) == int:
-				return Grid([gridrow.elements for gridrow in self.grid[index]],header=self.header)
+				return self._take(range(*index.indices(len(self))))
 			elif type(index.start) == str:
-				fields = self.header[self.header.index(index.start):self.header.index(index.stop)]
-				columns = [self[field] for field in fields]
-				return Grid(zip(*columns),header=fields)
+				return self.select(list(self._schema.fields[self._schema.index(index.start):self._schema.index(index.stop)]))
 			elif type(index.start) == str:
 				raise KeyError('Type'+str(type(index))+'not supported.')
 		elif callable(index):
@@ -352,196 +547,824 @@ class Grid(object):
 			field (str): Name of field to modify.
 			newValue (list/callable/other): Value of new column rows specified as:
 												List --> Assumes each element corresponds to one row.
-												Callable --> A function that is given each row and returns the new value.
+												Callable --> A function that is given each row and returns the new value
+															 (evaluated by self.workers processes, see apply).
+												Vectorized --> A function of whole columns (see vectorized.Vectorized).
 												Other --> Fixed value for all columns (can be Float, String, Bool, None, etc).
 		'''
 		assert(type(field) == str) # check a field is given.
-		for i,row in enumerate(self.grid):
-			#assign list corresponding value
-			if isinstance(newValue,list):
-				row[field] = newValue[i]
-			#calculate value with function
-			elif callable(newValue):
-				row[field] = newValue(row)
-			#constant value
-			else:
-				row[field] = newValue
-		# if field does not exist, append to header
-		if field not in self.header:
-			newHeader = self.header
-			newHeader.append(field)
-			self.header = newHeader
+		#assign list corresponding value
+		if isinstance(newValue,list):
+			if len(newValue) < len(self):
+				raise IndexError('[Grid|__setitem__]: New values ('+str(len(newValue))+') are less than Grid rows ('+str(len(self))+')')
+			column = _copyList(newValue[:len(self)])
+		#calculate value with a function of whole columns
+		elif isinstance(newValue,Vectorized):
+			column = _copyList(newValue.evaluate(self))
+		#calculate value with function
+		elif callable(newValue):
+			column = _copyList(self._applyRows(newValue))
+		#constant value
+		elif type(newValue) in _IMMUTABLE:
+			column = [newValue]*len(self)
+		else:
+			column = [deepcopy(newValue) for i in xrange(len(self))]
+		# if field does not exist, append it as a new column
+		if field in self.fieldIndex:
+			self._columns[self.fieldIndex[field]] = column
+			self._invalidateIndexes([self.fieldIndex[field]])
+		else:
+			self._columns.append(column)
+			self._setSchema(self._schema.append(field))
 
 	def __iter__(self):
 		'''
 		Iterate across all GridRows.
 		'''
-		return self.grid.__iter__()
+		return (GridRow._view(self,i) for i in xrange(len(self)))
 
 	def __len__(self):
 		'''
 		Returns length as number of GridRows.
 		'''
-		return len(self.grid)
+		if len(self._columns) == 0:
+			return 0
+		return len(self._columns[0])
 
 	def __repr__(self):
 		'''
 		Represent grid as a header followed by its GridRows elements.
 		'''
-		return ','.join(self.header)+'\n'+'\n'.join([str(i)+' '+str(row) for i,row in enumerate(self.grid)])
+		return ','.join(self.header)+'\n'+'\n'.join([str(i)+' '+str(row) for i,row in enumerate(self)])
 
 	def __sub__(self,row):
 		'''
 		Remove DataRow from Grid.
 		'''
 		self.removeRow(row)
-					
+
 	# private methods
 
-	def _initHeader(self,header):
+	def _initState(self):
+		'''
+		Set the state every Grid starts with, before its header and columns are read (shared by Grid and LazyGrid
+		constructors): no shared columns, no indexes and default settings.
+		'''
+		self._sharedColumns = set() # ids of columns shared with other Grids (copied before being modified)
+		self._indexes = {} # column indexes and statistics by (kind,tuple of fields)
+		# default settings
+		self.defaultFilterRule = 'OR'
+		self.zeroCopy = False
+		self.workers = 1 # processes evaluating row functions (function filters and callable columns), see apply
+
+	def _initHeader(self,header,rows):
 		'''
 		[Description]
-			Parse header to create the 'fieldIndex' dict which relates header entries with column index.
-			This dict allows to acess grid by header name (field name) as: self.grid[row][self.headerIndex[fieldName]]
+			Parse header to create the header schema, whose 'fieldIndex' dict relates header entries with column index.
+			This dict allows to acess grid columns by header name (field name) as: self._columns[self.fieldIndex[fieldName]]
 		[Arguments]
 			header (bool/list[str]):
+			rows (list[list[misc]]): First grid rows (at least two of them if available). Header row is removed from it when found.
+		'''
+		self._schema = Schema.intern(self._readHeader(header,rows))
+
+	@staticmethod
+	def _readHeader(header,rows):
+		'''
+		Return header list, removing header row from rows when found (see _initHeader).
 		'''
 		#grid does not have header. Assign header name as colN where N is the column index, e.g. col0,col1,..,colN
 		if header == False:
-			header = ['col'+str(i) for i in range(len(self.grid[0]))]
+			header = ['col'+str(i) for i in range(len(rows[0]))]
 		#header is given in first row
 		elif header == True:
-			header = self.grid.pop(0)
-		if len(self.grid) > 0:
-			if len(header) != len(self.grid[0]):
-				assert(len(header) == len(self.grid[1]))
+			header = list(rows.pop(0))
+		if len(rows) > 0:
+			if len(header) != len(rows[0]):
+				assert(len(header) == len(rows[1]))
 				print 'WARNING [Daty|Grid|_initHeader]: Invalid header removed and set to given header:',header
-				self.grid.pop(0)
-		self.fieldIndex = dict([(item,i) for i,item in enumerate(header)])
-		self._header = header
+				rows.pop(0)
+		return list(header)
+
+	def _parseParallel(self,path,header,workers,kwargs):
+		'''
+		Parse csv file into the columns with a pool of processes. Header is read here and the rest of the file is parsed by
+		the workers, which compile the same column converters from the first lines of the file.
+		'''
+		sample,ends = parallel.readSample(path,kwargs.get('sampleSize',100))
+		firstRows = lineParser(sample,**dict([(key,value) for key,value in kwargs.items() if key != 'blockSize']))(sample[:2])
+		nRows = len(firstRows)
+		self._initHeader(header,firstRows)
+		skip = nRows-len(firstRows) # header lines
+		self._columns = self._asColumns([])
+		start = ends[skip-1] if skip > 0 else 0
+		for rectangular,chunk in parallel.iterParseParallel(path,start,sample,len(self._schema),workers,**kwargs):
+			if rectangular:
+				for column,values in zip(self._columns,chunk):
+					column.extend(values)
+			else:
+				self._extendColumns(chunk)
+
+	def _applyRows(self,func,args=(),workers=None,chunkSize=1000,pool='process'):
+		'''
+		Return func(row,*args) for every row, evaluated over chunks of rows in a pool (see apply and parallel.mapRanges).
+		'''
+		def applyRange(start,stop):
+			return [func(GridRow._view(self,i),*args) for i in xrange(start,stop)]
+		return parallel.mapRanges(applyRange,len(self),self.workers if workers == None else workers,chunkSize,pool)
+
+	def _asColumns(self,rows):
+		'''
+		Transpose a list of rows into a list of columns matching grid header.
+		'''
+		for i,row in enumerate(rows):
+			if len(row) != len(self._schema):
+				raise IndexError('ERROR [Grid|_asColumns]: Row '+str(i)+' ('+str(len(row))+') does not have compatible length with Grid ('+str(len(self._schema))+')')
+		if len(rows) == 0:
+			return [[] for field in self._schema]
+		return [_copyList(column) for column in zip(*rows)]
+
+	def _extendColumns(self,rows,chunkSize=10000):
+		'''
+		Append rows from any iterable to the columns. Rows are transposed in chunks so that the iterable is never fully loaded.
+		'''
+		rows = iter(rows)
+		start = len(self)
+		chunk = list(islice(rows,chunkSize))
+		while len(chunk) > 0:
+			for i,values in enumerate(self._asColumns(chunk)):
+				self._writableColumn(i).extend(values)
+			chunk = list(islice(rows,chunkSize))
+		for index in self._indexes.values():
+			index.extend(self._indexColumns(index),start)
+
+	@staticmethod
+	def _fromColumns(columns,header):
+		'''
+		Create a Grid directly from a list of columns (columns are not copied, they are owned by the new Grid).
+		Header can be given as a list of fields or a Schema.
+		'''
+		grid = Grid([],header)
+		grid._columns = columns
+		return grid
+
+	def _fieldIndex(self,field):
+		'''
+		Return column index of a field given by name or column index.
+		'''
+		if type(field) == str:
+			return self.fieldIndex[field]
+		return field
+
+	def _column(self,field,positions=None):
+		'''
+		Return column storage of a given field (not copied, do not modify), or a list of its values at given row positions.
+		'''
+		column = self._columns[self._fieldIndex(field)]
+		if positions == None:
+			return column
+		return [column[i] for i in positions]
 
 	def _field(self,field):
 		'''
 		Return all values of a given field (full column).
+		With zeroCopy set, column storage itself is returned (do not modify it).
+		'''
+		if self.zeroCopy:
+			return self._column(field)
+		return _copyList(self._column(field))
+
+	def _take(self,rows,fieldIndexes=None):
+		'''
+		Return a new Grid containing given row indices (and only given columns, all of them by default).
+		'''
+		if fieldIndexes == None:
+			return self._fromColumns([[column[i] for i in rows] for column in self._columns],self._schema)
+		return self._fromColumns([[self._columns[j][i] for i in rows] for j in fieldIndexes],
+									[self._schema.fields[j] for j in fieldIndexes])
+
+	def _rowMask(self,rows):
+		'''
+		[Description]
+			Return mask of rows selected by a mask, predicate, filters or row indices (see drop).
+		[Arguments]
+			rows (list[bool]/numpy.ndarray/callable/Vectorized/dict/list[int]/int): Rows selection.
+			->return (list[bool]): True for every selected row.
+		'''
+		if isinstance(rows,Vectorized):
+			return map(partial(operator.eq,True),rows.evaluate(self))
+		elif callable(rows):
+			return map(partial(operator.eq,True),self._applyRows(rows))
+		elif type(rows) == dict:
+			mask = [False]*len(self)
+			for i in self._filterPositions(self._filterKind(rows),rows,self.defaultFilterRule):
+				mask[i] = True
+			return mask
+		elif isinstance(rows,Integral):
+			rows = [rows]
+		rows = list(rows) # masks and indices may be given as numpy arrays (numpy bools/ints)
+		types = set(map(type,rows))
+		if len(rows) > 0 and all([issubclass(rowType,_BOOLS) for rowType in types]):
+			if len(rows) != len(self):
+				raise IndexError('ERROR [Grid|_rowMask]: Mask length ('+str(len(rows))+') does not match Grid rows ('+str(len(self))+')')
+			return map(bool,rows)
+		if not all([issubclass(rowType,Integral) and not issubclass(rowType,_BOOLS) for rowType in types]):
+			raise ValueError('ERROR [Grid|_rowMask]: Rows must be given as a mask (bools) or row indices (ints), got '+
+								', '.join(sorted([rowType.__name__ for rowType in types])))
+		mask = [False]*len(self)
+		for i in rows:
+			mask[i] = True
+		return mask
+
+	def _distinctPositions(self,fields=None):
+		'''
+		Return the position of the first row of each distinct value of given fields (all fields by default), in ascending order.
+		Single fields are answered from cached field statistics.
+		'''
+		if fields == None:
+			fields = range(len(self._schema))
+		elif type(fields) != list:
+			fields = [fields]
+		if len(fields) == 1:
+			positions = self._getStats(fields[0]).distinctPositions()
+			if positions != None:
+				return positions
+		columns = [self._column(field) for field in fields]
+		keys = columns[0] if len(columns) == 1 else zip(*columns)
+		# first position of each key, later positions are overwritten by earlier ones
+		try:
+			first = dict(izip(reversed(keys),xrange(len(keys)-1,-1,-1)))
+		except TypeError: # unhashable values (lists)
+			first = dict(izip([_hashable(key) for key in reversed(keys)],xrange(len(keys)-1,-1,-1)))
+		return sorted(first.itervalues())
+
+	def _extremePositions(self,field,k,largest):
+		'''
+		Return positions of the k rows with the largest (or smallest) values of given field, in order. They are taken from a
+		sorted index (or sort order) of the field if there is one, otherwise selected with a heap of k rows. Rows with NaN
+		values are left out, as in sorted indexes.
+		'''
+		index = self._getIndex([self._schema.fields[field] if type(field) == int else field],'sorted')
+		if index != None and len(index) == len(self):
+			return index.ordered(largest,k)
+		column = self._column(field)
+		positions = xrange(len(self))
+		if _hasNaN(column):
+			positions = [i for i in positions if column[i] == column[i]]
+		if largest:
+			return heapq.nlargest(k,positions,key=column.__getitem__)
+		return heapq.nsmallest(k,positions,key=column.__getitem__)
+
+	def _compact(self,keep):
+		'''
+		Keep only rows whose mask value is True, rebuilding each column in a single pass. Return number of removed rows.
+		'''
+		removed = len(self)-sum(keep)
+		if removed > 0:
+			self._columns = [list(compress(column,keep)) for column in self._columns]
+			self._invalidateIndexes()
+		return removed
+
+	def _project(self,fieldIndexes,header):
+		'''
+		Return a new Grid with given columns, which are shared with this Grid until any of both modifies them (copy-on-write).
 		'''
-		if type(field) == str: field = self.fieldIndex[field]
-		return [row[field] for row in self.grid]
+		columns = [self._columns[i] for i in fieldIndexes]
+		shared = set([id(column) for column in columns])
+		self._sharedColumns.update(shared)
+		grid = self._fromColumns(columns,header)
+		grid._sharedColumns.update(shared)
+		return grid
+
+	def _writableColumn(self,fieldIndex):
+		'''
+		Return column storage to be modified in place, copying it first if it is shared with another Grid.
+		'''
+		column = self._columns[fieldIndex]
+		if id(column) in self._sharedColumns:
+			self._sharedColumns.discard(id(column))
+			column = list(column)
+			self._columns[fieldIndex] = column
+		return column
+
+	def _setSchema(self,schema):
+		'''
+		Replace header schema. Schemas are interned, so the grid gets the Schema shared by every Grid and GridRow with an equal
+		header (the same one again if a header change is undone).
+		'''
+		self._schema = Schema.intern(schema)
+
+	def _appendRow(self,elements):
+		'''
+		Append row elements to the end of each column.
+		'''
+		for i,element in enumerate(elements):
+			self._writableColumn(i).append(element)
+		for index in self._indexes.values():
+			index.add(self._indexColumns(index),len(self)-1)
+
+	def _setRow(self,row,elements):
+		'''
+		Overwrite row elements in each column.
+		'''
+		if len(elements) != len(self._schema):
+			raise IndexError('New row ('+str(len(elements))+') does not have compatible length with Grid ('+str(len(self._schema))+')')
+		if row < 0:
+			row += len(self)
+		for index in self._indexes.values():
+			index.remove(self._indexColumns(index),row)
+		for i,element in enumerate(elements):
+			self._writableColumn(i)[row] = element
+		for index in self._indexes.values():
+			index.add(self._indexColumns(index),row)
+
+	def _indexColumns(self,index):
+		'''
+		Return columns of index fields.
+		'''
+		return [self._column(field) for field in index.fields]
+
+	def _getIndex(self,fields,kind='hash'):
+		'''
+		Return up to date index of given kind and fields (in any order), or None if there is no such index.
+		Sorted indexes of the first field of an ascending sort order (see sort) are taken from the column itself.
+		'''
+		for index in self._indexes.values():
+			if index.kind == kind and len(index.fields) == len(fields) and set(index.fields) == set(fields):
+				if index.isStale():
+					index.build(self._indexColumns(index))
+				return index
+		if kind == 'sorted' and len(fields) == 1:
+			order = self._sortOrder()
+			if order != None and order.satisfies(fields,[False]):
+				return SortedIndex.fromSorted(fields,self._column(fields[0]))
+		return None
+
+	def _sortOrder(self):
+		'''
+		Return the order of grid rows (see indexes.SortOrder), checking it if it is stale, or None if rows are not sorted.
+		'''
+		for index in self._indexes.values():
+			if index.kind == 'order':
+				if index.isStale():
+					index.build(self._indexColumns(index))
+				return index if index.isSorted() else None
+		return None
+
+	def _getStats(self,field):
+		'''
+		Return up to date statistics of given field, computing them if they are not cached.
+		'''
+		field = self._schema.fields[field] if type(field) == int else field
+		stats = self._getIndex([field],'stats')
+		if stats == None:
+			stats = ColumnStats([field])
+			stats.build(self._indexColumns(stats))
+			self._indexes[(stats.kind,stats.fields)] = stats
+		return stats
+
+	def _renameIndexes(self,names):
+		'''
+		Rename fields of indexes and statistics, given a dict {oldName:newName}.
+		'''
+		indexes = self._indexes.values()
+		self._indexes = {}
+		for index in indexes:
+			index.fields = tuple([names.get(field,field) for field in index.fields])
+			self._indexes[(index.kind,index.fields)] = index
+
+	def _invalidateIndexes(self,fieldIndexes=None):
+		'''
+		Mark indexes of given columns (all indexes by default) as stale, so that they are rebuilt on next use.
+		'''
+		if fieldIndexes != None:
+			fields = set([self._schema.fields[i] for i in fieldIndexes])
+		for index in self._indexes.values():
+			if fieldIndexes == None or fields & set(index.fields):
+				index.invalidate()
+
+	def _indexedPositions(self,filters,rule):
+		'''
+		[Description]
+			Return positions of rows that match value filters using indexes, or None if there are no indexes for them.
+		[Arguments]
+			filters (dict): Filters defined as {field1/index:[value1, value2, value3], field2/index:[value1]}.
+			rule (str): OR/AND (see filter).
+			->return (list[int]/None): Row positions in ascending order.
+		'''
+		filters = dict([(self._schema.fields[field] if type(field) == int else field,values) for field,values in filters.items()])
+		# composite index matching all filter fields
+		if rule == 'AND' and len(filters) > 1:
+			index = self._getIndex(filters.keys())
+			if index != None:
+				positions = set()
+				for key in product(*[filters[field] for field in index.fields]):
+					positions.update(index.lookup(key))
+				return sorted(positions)
+		# single field indexes (sorted indexes also answer equality lookups)
+		indexes = [self._getIndex([field]) or self._getIndex([field],'sorted') for field in filters]
+		if None in indexes:
+			return None
+		matches = []
+		for index in indexes:
+			positions = set()
+			for value in filters[index.fields[0]]:
+				positions.update(index.lookup(value))
+			matches.append(positions)
+		if rule == 'OR':
+			return sorted(set().union(*matches))
+		matches.sort(key=len)
+		return sorted(matches[0].intersection(*matches[1:]))
+
+	def _sortedPositions(self,filters,rule):
+		'''
+		[Description]
+			Return positions of rows that satisfy expression filters using sorted indexes, or None if there are no sorted
+			indexes for them (or if any expression can not be answered by an index, e.g. '!=x').
+		[Arguments]
+			filters (dict): Filters defined as {field1/index:[expression1, expression2], field2/index:[expression1]}.
+			rule (str): OR/AND (see filter).
+			->return (list[int]/None): Row positions in ascending order.
+		'''
+		matches = []
+		for field,expressions in filters.items():
+			index = self._getIndex([self._schema.fields[field] if type(field) == int else field],'sorted')
+			if index == None:
+				return None
+			positions = set()
+			for expression in expressions:
+				parsed = parseExpression(expression)
+				if parsed[0] == 'compare':
+					function,value = parsed[1:]
+					if function == operator.eq:
+						positions.update(index.lookup(value))
+					elif function in (operator.le,operator.lt):
+						positions.update(index.lookupRange(function,value))
+					elif function in (operator.ge,operator.gt):
+						positions.update(index.lookupRange(upperFunction=function,upper=value))
+					else:
+						return None
+				elif parsed[0] == 'range':
+					positions.update(index.lookupRange(*parsed[1:]))
+				elif not parsed[1]:
+					for value in parsed[2]:
+						positions.update(index.lookup(value))
+				else:
+					return None
+			matches.append(positions)
+		if rule == 'OR':
+			return sorted(set().union(*matches))
+		matches.sort(key=len)
+		return sorted(matches[0].intersection(*matches[1:]))
+
+	@property
+	def grid(self):
+		'''
+		List of GridRows, each one a view of a row of grid columns.
+		'''
+		return [GridRow._view(self,i) for i in xrange(len(self))]
+
+	@grid.setter
+	def grid(self,rows):
+		'''
+		Replace all grid rows, rows must match current header.
+		'''
+		self._columns = self._asColumns(list(rows))
+		self._invalidateIndexes()
 
 	@property
 	def header(self):
 		'''
 		Header contains column names.
 		'''
-		return deepcopy(self._header)
+		return list(self._schema.fields)
 
 	@header.setter
 	def header(self, newHeader):
 		'''
-		Header setter updates header, fieldIndex dict and GridRows header.
+		Header setter replaces header schema, GridRow views share it so no row needs to be updated.
+		'''
+		if len(newHeader) != len(self._columns):
+			raise IndexError('ERROR [Grid|header.setter]: New header ('+str(len(newHeader))+') does not have compatible length with Grid ('+str(len(self._columns))+')')
+		names = dict(izip(self._schema.fields,newHeader))
+		self._setSchema(newHeader)
+		self._renameIndexes(names)
+
+	@property
+	def fieldIndex(self):
+		'''
+		Dict matching each field with its column index (shared by header schema, do not modify).
 		'''
-		self._header = newHeader
-		self.fieldIndex = dict([(item,i) for i,item in enumerate(newHeader)])
-		for row in self:
-			row.header = newHeader
+		return self._schema.fieldIndex
+
+	@classmethod
+	def iterChunks(cls,path,chunkSize=10000,header=True,**kwargs):
+		'''
+		[Description]
+			Read a csv file as a sequence of Grids with a fixed number of rows, so that files larger than memory can be processed.
+			File lines are streamed through the parser, only one chunk of rows is held in memory at a time.
+		[Arguments]
+			path (str): Path to file containing grid.
+			*chunkSize (int): Number of rows of each Grid (last one can be shorter).
+			*header (list[str]/bool): Same as in Grid.__init__. All chunks share the same header.
+			**kwargs (dict): Kwargs passed to utils.iterParse() function in charge of parsing grid from a file.
+			->return (generator[Grid]): Grids with consecutive file rows.
+		'''
+		with open(path,'r') as f:
+			rows = iterParse(f,**kwargs)
+			pending = list(islice(rows,2))
+			header = cls._readHeader(header,pending)
+			while True:
+				chunk = pending[:chunkSize]
+				pending = pending[chunkSize:]
+				chunk.extend(islice(rows,chunkSize-len(chunk)))
+				if len(chunk) == 0:
+					break
+				yield cls(chunk,header)
 
 	def bounds(self,field):
 		'''
 		Returns the bounds of a given field as a tuple (min,max).
+		Answered from a sorted index of the field if there is one (see createIndex), otherwise from cached field statistics.
 		'''
-		return min(self._field(field)),max(self._field(field))
+		index = self._getIndex([self._schema.fields[field] if type(field) == int else field],'sorted')
+		if index != None and len(index) == len(self):
+			return _copyValue(index.lowest()),_copyValue(index.highest())
+		stats = self._getStats(field)
+		if stats.nulls == 0 and stats.count > 0:
+			return _copyValue(stats.min),_copyValue(stats.max)
+		column = self._column(field)
+		return min(column),max(column)
 
 	def copy(self):
 		'''
 		Return copy of grid.
+		Columns are shared between both Grids and only copied when any of them is modified (copy-on-write).
 		'''
-		return deepcopy(self)
+		grid = self._project(range(len(self._columns)),self._schema)
+		grid.defaultFilterRule = self.defaultFilterRule
+		grid.zeroCopy = self.zeroCopy
+		grid.workers = self.workers
+		return grid
 
 	def dynamicTyped(self):
 		'''
 		Guess the grid type of each grid entry.
 		'''
 		self.header = [dynamicTyped(k) for k in self.header]
-		for i,j in enumerate(self.grid):
-			self.grid[i] = GridRow([dynamicTyped(k) for k in self.grid[i]],self.header)
-		#recreate fieldIndex dict with corrected types
-		self._initHeader(self.header)
+		self._columns = [[dynamicTyped(k) for k in column] for column in self._columns]
+		# field names may have changed, so indexes are dropped
+		self._indexes = {}
 
 	def fieldRange(self,field):
 		'''
-		Return all different values of a given field.
+		Return all different values of a given field, in order of appearance.
 		Field can be specified by column index or name.
+		Answered from cached field statistics, which keep the first row of each value.
 		'''
+		positions = self._getStats(field).distinctPositions()
+		column = self._column(field)
+		if positions != None:
+			return _copyList([column[i] for i in positions])
 		vals = []
-		for val in self._field(field):
+		for val in column:
 			if val not in vals: vals.append(val)
-		return vals
+		return _copyList(vals)
+
+	def stats(self,field):
+		'''
+		[Description]
+			Return statistics of a given field. Statistics are computed once and cached: appended rows update them and other
+			changes of the field values mark them to be computed again on next call.
+		[Arguments]
+			field (str/int): Field name or column index.
+			->return (dict): count --> Number of values.
+							 nulls --> Number of None/NaN values.
+							 distinct --> Number of different values (nulls included), None if values can not be hashed.
+							 min, max --> Bounds of non null values.
+							 sum, mean --> Sum and mean of non null values, None if any of them is not a number.
+		'''
+		return self._getStats(field).asDict()
 
 	def round(self,precision):
 		'''
 		Return a copy of self.grid with numeric elements in GridRows rounded to specified precision.
 		'''
-		return [row.round(precision) for row in self.grid]
+		return [row.round(precision) for row in self]
 
-	def save(self,path,columns=None,header=True,listSeparator=';'):
+	def save(self,path,columns=None,header=True,listSeparator=';',compression='infer',chunkSize=10000):
 		'''
 		[Description]
-			Save grid to file in csv format.
+			Save grid to file in csv format. Rows are formatted in chunks, column by column, and each chunk is written at once.
 		[Arguments]
-			path (str): Path to save file.
+			path (str/file): Path to save file or any file-like object with a write method (file, socket file, pipe, StringIO...).
 			*columns (list[str]/slice): Columns to save. By default all columns are saved.
 			*header (bool): Include header.
 			*listSeparator (bool): Separator for lists.
+			*compression (None/str): gzip/bz2 compression of the output. Set to 'infer' to compress files whose path ends with
+									.gz or .bz2.
+			*chunkSize (int): Number of rows formatted and written at once.
 		'''
 		if columns != None:
 			gridToSave = self[columns]
 		else:
 			gridToSave = self
-		sep = ','
-		append = '\n'
-		aFile = open(path,'w+')
-		if header == True:
-			gridToSave = [gridToSave.header]+gridToSave.grid
-		else:
-			gridToSave = gridToSave.grid
-		for i,line in enumerate(gridToSave):
-			parsedLine = []
-			#check if item is a list and parse it accordingly to avoid quote marks.
-			for item in line:
-				if isinstance(item,list):
-					parsedLine.append('['+listSeparator.join([str(i) for i in item])+']')
+		with Writer(path,compression) as aFile:
+			if header == True:
+				aFile.write(formatRows([gridToSave.header],listSep=listSeparator))
+			for start in xrange(0,len(gridToSave),chunkSize):
+				aFile.write(formatColumns([column[start:start+chunkSize] for column in gridToSave._columns],listSep=listSeparator))
+
+	@staticmethod
+	def saveIter(path,rows,header=True,listSeparator=';',compression='infer',chunkSize=10000):
+		'''
+		[Description]
+			Save rows to file in csv format as they are produced, without holding them all in memory, e.g.
+				Grid.saveIter('out.csv.gz',(chunk.filter({'TWS':10}) for chunk in Grid.iterChunks('in.csv')))
+			Rows are buffered and formatted in chunks the same way as in save.
+		[Arguments]
+			path (str/file): Path to save file or any file-like object with a write method (file, socket file, pipe, StringIO...).
+			rows (iterable[list/GridRow/Grid]): Rows to save, given as lists or GridRows, or as Grids whose rows are all saved.
+			*header (list[str]/bool): Header to include. True takes it from the first Grid/GridRow and False saves no header.
+			*listSeparator (bool): Separator for lists.
+			*compression (None/str): Same as in save.
+			*chunkSize (int): Number of rows formatted and written at once.
+		'''
+		with Writer(path,compression) as aFile:
+			pending = []
+			for item in rows:
+				if header == True:
+					if not isinstance(item,(Grid,GridRow)):
+						raise ValueError('ERROR [Grid|saveIter]: Header can not be taken from a list row, give it explicitly')
+					header = item.header
+				if header not in (False,None):
+					aFile.write(formatRows([header],listSep=listSeparator))
+					header = False
+				if isinstance(item,Grid):
+					if len(pending) > 0:
+						aFile.write(formatRows(pending,listSep=listSeparator))
+						pending = []
+					for start in xrange(0,len(item),chunkSize):
+						aFile.write(formatColumns([column[start:start+chunkSize] for column in item._columns],listSep=listSeparator))
 				else:
-					parsedLine.append(str(item))
-			parsedLine[-1] += append
-			aFile.write(sep.join(parsedLine))
-		aFile.close()
+					pending.append(item._values() if isinstance(item,GridRow) else item)
+					if len(pending) >= chunkSize:
+						aFile.write(formatRows(pending,listSep=listSeparator))
+						pending = []
+			if len(pending) > 0:
+				aFile.write(formatRows(pending,listSep=listSeparator))
+
+	def saveBinary(self,path,columns=None):
+		'''
+		[Description]
+			Save grid to file in binary columnar format (see binary module): float, int and bool columns are stored as typed
+			blocks and any other column as JSON. Much faster to load than csv files, see loadBinary.
+		[Arguments]
+			path (str): Path to save file.
+			*columns (list[str]): Columns to save. By default all columns are saved.
+		'''
+		fields = self.header if columns == None else columns
+		binary.write(path,fields,[self._column(field) for field in fields])
+
+	@staticmethod
+	def loadBinary(path,columns=None,mmap=True):
+		'''
+		[Description]
+			Load grid saved with saveBinary. Only the requested columns are read from disk.
+		[Arguments]
+			path (str): Path to file.
+			*columns (list[str]): Columns to load. By default all columns are loaded.
+			*mmap (bool): Memory map the file instead of reading it, so that column blocks are decoded straight from the OS page
+							cache (see binary.read).
+			->return (Grid): Loaded grid.
+		'''
+		fields,columns = binary.read(path,columns,mmap)
+		return Grid._fromColumns(columns,fields)
+
+	@staticmethod
+	def fromJson(path,orient='records',fill_value=None,chunkSize=10000):
+		'''
+		[Description]
+			Load grid from JSON, e.g. written with toJson:
+				records --> NDJSON with one object per line {"TWS":10,"TWA":45,...} (streamed in chunks of lines) or a JSON list
+							of objects. Header is the union of the fields of all records, in order of first appearance.
+				columns --> A single object {"TWS":[10,10,...],"TWA":[45,50,...],...}, or NDJSON with one field per line.
+		[Arguments]
+			path (str/file): Path to file (.gz and .bz2 files are decompressed) or any file-like object.
+			*orient (str): records/columns.
+			*fill_value (misc): Value of fields missing in a record (or in a short column).
+			*chunkSize (int): Number of records parsed at once.
+			->return (Grid): Loaded grid.
+		'''
+		if orient == 'columns':
+			fields,columns = reader.readColumns(path,fill_value)
+			return Grid._fromColumns(columns,fields)
+		if orient != 'records':
+			raise ValueError('ERROR [Grid|fromJson]: Unknown orient '+str(orient))
+		fields = []
+		columns = []
+		nRows = 0
+		for fields,chunk in reader.iterRecords(path,chunkSize,fill_value):
+			# fields that first appear in this chunk are filled in previous rows
+			columns.extend([[fill_value]*nRows for i in xrange(len(fields)-len(columns))])
+			for column,values in zip(columns,chunk):
+				column.extend(values)
+			nRows += len(chunk[0]) if len(chunk) > 0 else 0
+		return Grid._fromColumns(columns,fields)
+
+	@staticmethod
+	def iterJson(path,chunkSize=10000,fill_value=None):
+		'''
+		[Description]
+			Read JSON records (see fromJson) as a sequence of Grids with a fixed number of rows, so that unbounded NDJSON
+			streams (e.g. sys.stdin or a socket file) and files larger than memory can be processed.
+		[Arguments]
+			path (str/file): Path to file (.gz and .bz2 files are decompressed) or any file-like object.
+			*chunkSize (int): Number of rows of each Grid (last one can be shorter).
+			*fill_value (misc): Value of fields missing in a record.
+			->return (generator[Grid]): Grids with consecutive records. Header of each Grid is the union of the fields of all
+										records read so far.
+		'''
+		for fields,columns in reader.iterRecords(path,chunkSize,fill_value):
+			yield Grid._fromColumns(columns,list(fields))
 
 	def shape(self):
 		'''
 		Return nRows x nCols.
 		'''
-		return (len(self.grid),len(self.grid[0]))
+		return (len(self),len(self._schema))
 
 	def sort(self,field,reverse=False):
 		'''
-		Sort grid by given field.
-		Field can be given as header name or index.
+		Sort grid by given field, or by several fields (the first one is the primary key), e.g. grid.sort(['TWS','Vs'],[False,True]).
+		Fields can be given as header names or indices. Reverse can be given for all fields or as a list (one per field).
+		Row order is taken from a sorted index of the field if there is one (see createIndex).
+		Grid remembers the fields it is sorted by until rows are modified: sorting again by them (or by the first ones) is
+		free, and filters, bounds, topK and nsmallest of the first field use binary search as with a sorted index.
+		'''
+		fields = [self._schema.fields[key] if type(key) == int else key for key in (field if type(field) == list else [field])]
+		reverse = reverse if type(reverse) == list else [reverse]*len(fields)
+		if len(reverse) != len(fields):
+			raise ValueError('ERROR [Grid|sort]: Number of reverse values ('+str(len(reverse))+') does not match number of fields ('+str(len(fields))+')')
+		sortOrder = self._sortOrder()
+		if sortOrder != None and sortOrder.satisfies(fields,reverse):
+			return
+		index = self._getIndex(fields,'sorted') if len(fields) == 1 else None
+		if index != None and len(index) == len(self):
+			order = index.ordered(reverse[0])
+		else:
+			# stable sorts from the last key to the first one, keys are read straight from columns
+			order = range(len(self))
+			for key,descending in reversed(zip(fields,reverse)):
+				order.sort(key=self._column(key).__getitem__,reverse=descending)
+		self._columns = [[column[i] for i in order] for column in self._columns]
+		self._invalidateIndexes()
+		for key in [key for key in self._indexes if key[0] == 'order']:
+			del self._indexes[key]
+		sortOrder = SortOrder(fields,reverse)
+		if any([_hasNaN(self._column(key)) for key in fields]):
+			sortOrder.build(self._indexColumns(sortOrder)) # NaN values are left unordered by sort
+		else:
+			sortOrder.assumeSorted()
+		self._indexes[(sortOrder.kind,sortOrder.fields)] = sortOrder
+
+	def topK(self,field,k):
 		'''
-		field = self.fieldIndex[field]
-		self.grid.sort(key=lambda x:x[field],reverse=reverse)
+		[Description]
+			Return a Grid with the k rows with the largest values of given field, in descending order (same as sorting a
+			copy of the grid in reverse order and taking its first k rows, but without sorting all rows). Rows with NaN
+			values of the field are left out.
+		[Arguments]
+			field (str/int): Field name or column index.
+			k (int): Number of rows.
+			->return (Grid): Top k rows.
+		'''
+		return self._take(self._extremePositions(field,k,True))
+
+	def nsmallest(self,field,k):
+		'''
+		[Description]
+			Return a Grid with the k rows with the smallest values of given field, in ascending order (see topK).
+		[Arguments]
+			field (str/int): Field name or column index.
+			k (int): Number of rows.
+			->return (Grid): Bottom k rows.
+		'''
+		return self._take(self._extremePositions(field,k,False))
 
 	def head(self,nRows=4):
 		'''
 		Unix-like command, shows the first 5 rows of grid.
 		'''
-		for row in self.grid[0:nRows]:
-			print row
+		for i in xrange(min(nRows,len(self))):
+			print self.row(i)
 
 	def tail(self):
 		'''
 		Unix-like command, shows the last 5 rows of grid.
 		'''
-		for row in self.grid[-4:]:
-			print row
+		for i in xrange(max(len(self)-4,0),len(self)):
+			print self.row(i)
 
 	# transform
 
@@ -552,20 +1375,38 @@ class Grid(object):
 							{'TWS':10,'TWA':45,'Vs':12,...},
 							{'TWS':10,'TWA':45,'Vs':12,...},
 							{'TWS':10,'TWA':45,'Vs':12,...}
-						]		
+						]
 		'''
-		gridAsJson = []
-		if roundFloats == None:
-			gridAsJson = [row.asDict() for row in self]
-		else:
-			gridAsJson = [row.round(roundFloats).asDict() for row in self]
-		return gridAsJson
+		fields = self.header
+		columns = self._columns if roundFloats == None else [roundValues(column,roundFloats) for column in self._columns]
+		return [OrderedDict(izip(fields,_copyList(values))) for values in izip(*columns)]
+
+	def toJson(self,path,orient='records',ndjson=True,columns=None,roundFloats=None,compression='infer',chunkSize=10000):
+		'''
+		[Description]
+			Write grid in JSON format, straight from column storage in chunks of rows, e.g.
+				grid.toJson('grid.ndjson')				--> {"TWS":10,"TWA":45,"Vs":12,...} on each line.
+				grid.toJson(f,ndjson=False)				--> [{"TWS":10,"TWA":45,"Vs":12,...},...]
+				grid.toJson(f,'columns',ndjson=False)	--> {"TWS":[10,10,...],"TWA":[45,50,...],...}
+			See writer.writeJson for all formats.
+		[Arguments]
+			path (str/file): Path to save file or any file-like object with a write method (file, socket file, pipe, StringIO...).
+			*orient (str): records --> One object per row.
+						   columns --> Lists of values by field.
+			*ndjson (bool): Newline delimited JSON (one JSON document per line).
+			*columns (list[str]): Columns to write. By default all columns are written.
+			*roundFloats (int/None): Round numbers to given precision as they are written.
+			*compression (None/str): gzip/bz2 compression (see save).
+			*chunkSize (int): Number of rows formatted and written at once.
+		'''
+		fields = self.header if columns == None else columns
+		writeJson(path,fields,[self._column(field) for field in fields],orient,ndjson,roundFloats,compression,chunkSize)
 
 	def asList(self):
 		'''
 		Return a list representation of Grid.
 		'''
-		return [gridrow.elements for gridrow in self]
+		return [_copyList(elements) for elements in zip(*self._columns)]
 
 	# row (GridRow) manipulation
 
@@ -574,21 +1415,33 @@ class Grid(object):
 		[Description]
 			Delete all grid rows.
 		'''
-		self.grid = []
+		self._columns = [[] for column in self._columns]
+		self._invalidateIndexes()
 
 	def index(self,row,reverse=False):
 		'''
-		Returns the index of a given row.
-		If there are duplicates, only the first one found is returned.
-		'''
-		if reverse == False:
-			for i,j in enumerate(self.grid):
-				if j == row:
-					return i
+		Returns the index of a given row (GridRow or list of elements), or None if it is not found.
+		If there are duplicates, only the first one found is returned (the last one if reverse is set).
+		Answered from a hash index of all fields if there is one (see createIndex), otherwise rows are scanned.
+		'''
+		values = row._values() if isinstance(row,GridRow) else list(row)
+		if len(values) != len(self._schema):
+			return None
+		index = self._getIndex(list(self._schema.fields),'hash')
+		if index != None:
+			key = [values[self._schema.index(field)] for field in index.fields]
+			positions = index.lookup(key[0] if len(key) == 1 else tuple(key))
+			if len(positions) > 0:
+				return positions[-1] if reverse else positions[0]
+			return None
+		target = tuple(values)
+		if reverse:
+			rows = izip(xrange(len(self)-1,-1,-1),izip(*[reversed(column) for column in self._columns]))
 		else:
-			for i,j in enumerate(reversed(self.grid)):
-				if j == row:
-					return i			
+			rows = enumerate(izip(*self._columns))
+		for i,elements in rows:
+			if elements == target:
+				return i
 
 	def match(self,gridRow,fill_value=None):
 		'''
@@ -597,7 +1450,7 @@ class Grid(object):
 			Missing fields are populated with fill_value.
 		[Arguments]
 			gridRow (GridRow): GridRow to be matched to Grid.
-			*fill_value (None/misc): Value to set missing fields at. 
+			*fill_value (None/misc): Value to set missing fields at.
 		'''
 		# compare to self.header and add missing header entries to GridRow header.
 		for i,field in enumerate(self.header):
@@ -618,12 +1471,12 @@ class Grid(object):
 		[Description]
 			Remove rows with None values.
 		[Arguments]
-			*field (str): Field checked for NoneType to decide if row is kept. 
+			*field (str): Field checked for NoneType to decide if row is kept.
 		'''
 		if field == None:
-			return Grid([row.elements for row in self.grid if None not in row.elements],header=self.header)
+			return self._take([i for i,elements in enumerate(zip(*self._columns)) if None not in elements])
 		else:
-			return Grid([row.elements for row in self.grid if row[field] != None],header=self.header)
+			return self._take([i for i,element in enumerate(self._column(field)) if element != None])
 
 	def addRow(self,newRow,fill_value=None):
 		'''
@@ -634,29 +1487,95 @@ class Grid(object):
 			newRow (list/GridRow/Grid): List, GridRow or Grid to add to grid.
 			*fill_value (float / float list): Value to be used for filling unmatched columns.
 		'''
-		newRow = deepcopy(newRow)
 		# add gridrow to grid
 		if isinstance(newRow,GridRow):
+			newRow = newRow._copy()
 			#match headers
 			self.match(newRow,fill_value)
 			#add row to grid.
-			self.grid.append(newRow)
+			self._appendRow(newRow._values())
 		# list given, assume both headers match
 		elif isinstance(newRow,list):
 			if len(newRow) == len(self.header):
-				self.grid.append(GridRow(newRow,self.header))
+				self._appendRow(_copyList(newRow))
 			else:
 				raise IndexError('New row ('+str(len(newRow))+') does not have compatible length with Grid ('+str(len(self.header))+')')
 		# Grid given, add all its gridrows to grid
 		elif isinstance(newRow, Grid):
-			for row in newRow:
-				#match headers
-				self.match(row,fill_value)
-				#add row to grid.
-				self.grid.append(row)
+			self.extend([newRow],fill_value)
 		else:
 			raise TypeError('[Grid|__add__]: Not implemented yet for type '+str(type(newRow)))
 
+	def extend(self,sources,fill_value=None):
+		'''
+		[Description]
+			Append all rows of the given Grids, GridRows and/or lists in bulk.
+			Headers are matched once per Grid (and once per batch of consecutive GridRows with the same header), not per row:
+			fields missing in grid are added as new columns and fields missing in a source are set to fill_value, as addRow does.
+			Lists are assumed to match grid header.
+		[Arguments]
+			sources (Grid/iterable[Grid/GridRow/list]): Rows to append. Any iterable can be given (e.g. a generator of Grids).
+			*fill_value (None/misc): Value to set missing fields at.
+		'''
+		if isinstance(sources,(Grid,GridRow)):
+			sources = [sources]
+		start = len(self)
+		batch = []
+		for source in chain(sources,[None]):
+			# flush batch of lists/GridRows when source can not be added to it
+			if len(batch) > 0 and not (type(source) == type(batch[0]) and
+										(isinstance(source,list) or source._getSchema() is batch[0]._getSchema())):
+				if isinstance(batch[0],list):
+					for i,values in enumerate(self._asColumns(batch)):
+						self._writableColumn(i).extend(values)
+				else:
+					self._extendFields(batch[0]._fields(),zip(*[row._values() for row in batch]),len(batch),fill_value)
+				batch = []
+			if isinstance(source,Grid):
+				self._extendFields(source.header,source._columns,len(source),fill_value)
+			elif isinstance(source,(list,GridRow)):
+				batch.append(source)
+			elif source != None:
+				raise TypeError('[Grid|extend]: Not implemented yet for type '+str(type(source)))
+		for index in self._indexes.values():
+			index.extend(self._indexColumns(index),start)
+
+	@staticmethod
+	def concat(sources,fill_value=None):
+		'''
+		[Description]
+			Return a new Grid with all rows of given Grids (see extend). Resulting header has the fields of all Grids in order
+			of appearance, e.g. to aggregate the results of several runs:
+				Grid.concat(Grid(path) for path in paths)
+		[Arguments]
+			sources (iterable[Grid/GridRow/list]): Rows to concatenate.
+			*fill_value (None/misc): Value to set missing fields at.
+			->return (Grid): Concatenated grid.
+		'''
+		grid = Grid([],[])
+		grid.extend(sources,fill_value)
+		return grid
+
+	def _extendFields(self,fields,columns,length,fill_value):
+		'''
+		Append columns of given fields (with given number of rows), adding missing fields to grid and filling missing columns.
+		Added fields are only reported when grid already had fields (not when it takes the fields of the first rows, as in concat).
+		'''
+		report = len(self._schema) > 0
+		for field in fields:
+			if field not in self.fieldIndex:
+				if report:
+					print '[Grid|extend]: Adding header',field
+				self[field] = fill_value
+		columnIndex = dict(izip(fields,xrange(len(fields))))
+		for i,field in enumerate(self._schema):
+			if field in columnIndex:
+				self._writableColumn(i).extend(_copyList(columns[columnIndex[field]]))
+			elif type(fill_value) in _IMMUTABLE:
+				self._writableColumn(i).extend([fill_value]*length)
+			else:
+				self._writableColumn(i).extend([deepcopy(fill_value) for row in xrange(length)])
+
 	def removeRow(self,row):
 		'''
 		[Description]
@@ -665,19 +1584,86 @@ class Grid(object):
 			row (GridRow/int/list): GridRow, row index or row elements of row to delete.
 		'''
 		if isinstance(row,int):
-			self.removeRow(row)
+			for i in xrange(len(self._columns)):
+				del self._writableColumn(i)[row]
+			self._invalidateIndexes()
 		elif isinstance(row,list):
-			for i,gridrow in enumerate(self):
-				if gridrow == row:
-					self.grid.pop(i)
+			self._compact([list(elements) != row for elements in izip(*self._columns)])
 		elif isinstance(row,GridRow):
-			self.grid.remove(row)
+			index = self.index(row)
+			if index == None:
+				raise ValueError('[Grid|removeRow]: GridRow not found in Grid')
+			self.removeRow(index)
+
+	def drop(self,rows=None,columns=None):
+		'''
+		[Description]
+			Remove rows and/or columns from grid in place, rebuilding each column in a single pass, e.g.
+				grid.drop(lambda row: row['Total_Fx'] == None)
+				grid.drop({'config':'upwind'})
+				grid.drop([0,5,9])
+				grid.drop(columns=['Total_Fx','Total_Fy'])
+		[Arguments]
+			*rows (list[bool]/numpy.ndarray/callable/Vectorized/dict/list[int]/int/None): Rows to remove, given as:
+				list[bool] --> Mask with one value per row (True to remove it), also as numpy bools or a numpy bool array.
+				callable --> Function f(gridrow) = bool, evaluated by self.workers processes (see apply).
+				Vectorized --> Function of whole columns returning a mask (see vectorized.Vectorized).
+				dict --> Filters (see filter), rows that pass them are removed.
+				list[int]/int --> Row indices (negative indices count from the end).
+			*columns (str/int/list[str/int]/None): Columns to remove (see removeColumn).
+			->return (int): Number of removed rows.
+		'''
+		removed = 0
+		if rows is not None:
+			removed = self._compact([not remove for remove in self._rowMask(rows)])
+		if columns is not None:
+			self.removeColumn(columns)
+		return removed
+
+	def retain(self,rows):
+		'''
+		[Description]
+			Keep only the given rows in place, removing all the others (opposite of drop), e.g.
+				grid.retain(lambda row: row['TWS'] > 6)
+		[Arguments]
+			rows (list[bool]/numpy.ndarray/callable/Vectorized/dict/list[int]/int): Rows to keep, given as in drop.
+			->return (int): Number of removed rows.
+		'''
+		return self._compact(self._rowMask(rows))
+
+	def unique(self,fields=None):
+		'''
+		[Description]
+			Return a Grid with the first row of each distinct value of given fields (whole rows by default), in a single
+			pass over the rows (rows are hashed, see also dropDuplicates).
+		[Arguments]
+			*fields (str/int/list[str/int]/None): Fields whose values must be distinct. By default all of them.
+			->return (Grid): Grid without duplicates.
+		'''
+		return self._take(self._distinctPositions(fields))
+
+	def dropDuplicates(self,fields=None):
+		'''
+		[Description]
+			Remove rows whose values of given fields (whole rows by default) are equal to those of a previous row, in place.
+		[Arguments]
+			*fields (str/int/list[str/int]/None): Fields compared. By default all of them.
+			->return (int): Number of removed rows.
+		'''
+		keep = [False]*len(self)
+		for i in self._distinctPositions(fields):
+			keep[i] = True
+		return self._compact(keep)
 
 	def row(self,index):
 		'''
 		Return GridRow by index
 		'''
-		return self.grid[index]
+		if index < 0:
+			index += len(self)
+		if index < 0 or index >= len(self):
+			raise IndexError('[Grid|row]: Row index out of range')
+		return GridRow._view(self,index)
 
 	def replace(self,old,new,fill_value=0.0):
 		'''
@@ -686,21 +1672,44 @@ class Grid(object):
 		[Arguments]:
 			old (index/GridRow): GridRow to replace of index in self.grid.
 		'''
+		if type(old) != int: old = self.index(old)
 		if isinstance(new,GridRow):
+			new = new._copy()
 			#match headers
 			self.match(new,fill_value)
-			#add row to grid. This raises ERROR if index is not found.
-			if type(old) != int: old = self.index(old)
-			self.grid[old] = new
-			# print 'Warning [Grid.replace]: Grid could not find', old
+			#replace row in grid. This raises ERROR if index is not found.
+			self._setRow(old,new._values())
 		#if a list is given directly, assume both headers match
 		elif isinstance(new,list):
-			self.grid[self.index(old)] = GridRow(new,self.header)
+			self._setRow(old,_copyList(new))
 		else:
-			print '[Grid|replace]: '+type(new)+' replacement not implemented yet'
+			print '[Grid|replace]: '+str(type(new))+' replacement not implemented yet'
 
 	# column (field) manipulation
 
+	def apply(self,func,field=None,workers=None,chunkSize=1000,pool='process'):
+		'''
+		[Description]
+			Evaluate a function of each row over chunks of rows in a pool of processes or threads, keeping row order, e.g.
+				grid.apply(lambda row: solve(row['TWS'],row['TWA']),'Fx',workers=8)
+			Worth it for expensive functions (milliseconds per row), cheap ones are faster in a single process.
+		[Arguments]
+			func (function): Function f(gridrow) = value.
+			*field (str/None): Field where results are stored in one step (a new column if it does not exist). Set to None to
+								return them instead.
+			*workers (int/None): Number of processes/threads. Set to None to use self.workers, which also applies to
+									function filters and callable columns (grid[field] = func).
+			*chunkSize (int): Number of rows given to a worker at once.
+			*pool (str): process --> Forked processes. Any function can be used (lambdas included), but its results must be
+										picklable and changes it makes to rows are not seen by this grid.
+						 thread --> Threads, only faster for functions that release the GIL (I/O, NumPy, C extensions...).
+			->return (list/None): Function values of all rows when no field is given.
+		'''
+		values = self._applyRows(func,(),workers,chunkSize,pool)
+		if field == None:
+			return _copyList(values)
+		self[field] = values
+
 	def addColumn(self,newHeaderEntry,newValue=None,newIndex=-1):
 		'''
 		[Description]
@@ -718,30 +1727,52 @@ class Grid(object):
 		self[newHeaderEntry] = newValue
 		# move to desired position
 		if newIndex != -1:
-			self.moveColumn(newHeaderEntry, newIndex)			
+			self.moveColumn(newHeaderEntry, newIndex)
 
 	def removeColumn(self,fields):
 		'''
 		[Description]
-			Removes column (or columns) from grid.
+			Removes column (or columns) from grid, rebuilding the list of columns and header once.
 		[Arguments]
 			fields (int/str/list[int/str]): Name or column index of fields to delete.
 		'''
 		if type(fields) != list:
 			fields = [fields]
-		# Convert any given column index to its field name.
-		for i,field in enumerate(fields):
-			if type(field) == int:
-				fields[i] = self.header[field]
+		# Convert any given field name to its column index (negative indices count from the end).
+		removed = set()
 		for field in fields:
-			#delete field from each GridRow
-			for row in self.grid:		
-				row.pop(field)
-			#update header
-			index = self.header.index(field)
-			newHeader = self.header
-			newHeader.pop(index)
-			self.header = newHeader
+			if type(field) == int:
+				if field < -len(self._schema) or field >= len(self._schema):
+					raise IndexError('ERROR [Grid|removeColumn]: Column index '+str(field)+' out of range')
+				removed.add(field%len(self._schema))
+			else:
+				removed.add(self._schema.index(field))
+		if len(removed) == 0:
+			return
+		removedFields = set([self._schema.fields[i] for i in removed])
+		keep = [i for i in xrange(len(self._schema)) if i not in removed]
+		#delete columns
+		self._columns = [self._columns[i] for i in keep]
+		#drop their indexes
+		for key in [key for key in self._indexes if removedFields & set(key[1])]:
+			del self._indexes[key]
+		#update header
+		self._setSchema([self._schema.fields[i] for i in keep])
+
+	def select(self,fields):
+		'''
+		[Description]
+			Return a Grid with given columns (projection), e.g. grid.select(['TWS','TWA','Vs']).
+			Columns are shared with this grid without copying them until any of both modifies them (copy-on-write), so
+			projecting costs O(columns) no matter how many rows there are.
+		[Arguments]
+			fields (str/int/list[str/int]): Field names or column indices, in the order of the new grid.
+			->return (Grid): Projected grid.
+		'''
+		if type(fields) != list:
+			fields = [fields]
+		fieldIndexes = [self._fieldIndex(field) for field in fields]
+		return self._project(fieldIndexes,[self._schema.fields[i] for i in fieldIndexes])
 
 	def moveColumn(self,field,newIndex):
 		'''
@@ -752,20 +1783,65 @@ class Grid(object):
 			newIndex (int/str): Position to move column. If a field name is given, the column will be moved to its current position.
 		'''
 		if type(newIndex) == str:
-			newIndex = self.header.index(newIndex)
-		# update rows
-		for row in self:
-			row.moveField(field,newIndex)
-		# update Grid header with a gridrow header
-		self.header = row.header
+			newIndex = self._schema.index(newIndex)
+		if newIndex > len(self._schema):
+			raise IndexError('ERROR [Grid|moveColumn]: Cannot move field to a position greater than Grid width')
+		currentIndex = self._fieldIndex(field)
+		# move column
+		self._columns.insert(newIndex,self._columns.pop(currentIndex))
+		# update header
+		self._setSchema(self._schema.move(currentIndex,newIndex))
 
 	def renameColumn(self,oldName,newName):
 		'''
 		Rename field.
 		'''
-		tmpHeader = self.header
-		tmpHeader[self.header.index(oldName)] = newName
-		self.header = tmpHeader
+		self._setSchema(self._schema.rename(self._schema.index(oldName),newName))
+		self._renameIndexes({oldName:newName})
+
+	# indexes
+
+	def createIndex(self,fields=None,kind='hash'):
+		'''
+		[Description]
+			Create an index on given field (or composite index on several fields). Filters use indexes automatically and
+			indexes are kept up to date when grid changes.
+				hash	--> Equality lookups. Used by value filters (e.g. grid[{'speed':10}]): single field indexes for any of
+							the filtered fields and composite indexes for AND filters on all their fields. A hash index of all
+							fields (row hash index) is used by index and removeRow to find rows.
+				sorted	--> Single field, ordered values. Used by expression filters (e.g. grid[{'speed':'<10'}], '[2,5)',
+							'in (6,8)'), value filters, bounds and sort.
+		[Arguments]
+			*fields (str/list[str]/None): Field name or list of field names. By default all fields.
+			*kind (str): hash/sorted.
+		'''
+		if fields == None:
+			fields = list(self._schema.fields)
+		elif type(fields) != list:
+			fields = [fields]
+		fields = [self._schema.fields[field] if type(field) == int else field for field in fields]
+		if kind == 'hash':
+			index = HashIndex(fields)
+		elif kind == 'sorted':
+			index = SortedIndex(fields)
+		else:
+			raise ValueError('ERROR [Grid|createIndex]: Unknown index kind '+str(kind))
+		index.build(self._indexColumns(index))
+		self._indexes[(index.kind,index.fields)] = index
+
+	def dropIndex(self,fields=None,kind='hash'):
+		'''
+		[Description]
+			Delete index created with createIndex.
+		[Arguments]
+			*fields (str/list[str]/None): Field name or list of field names. By default all fields.
+			*kind (str): hash/sorted.
+		'''
+		if fields == None:
+			fields = list(self._schema.fields)
+		elif type(fields) != list:
+			fields = [fields]
+		del self._indexes[(kind,tuple([self._schema.fields[field] if type(field) == int else field for field in fields]))]
 
 	# filters
 
@@ -773,6 +1849,9 @@ class Grid(object):
 		'''
 		[Description]
 			Retruns a subset of the grid that satisfies the given filters.
+			Each filter is evaluated over whole columns into a row mask (vectorized with NumPy for numeric columns when
+			available) and masks are combined before building the resulting grid.
+			Function filters are evaluated by self.workers processes (see apply).
 		[Arguments]
 			filters (dict): Filters (see _filter_value, _filter_function and _filter_expression for details).
 			rule (None/str): Set to OR for filtering in points that pass ANY of the filters.
@@ -781,6 +1860,133 @@ class Grid(object):
 		'''
 		if rule == None:
 			rule = self.defaultFilterRule
+		return self._take(self._filterPositions(self._filterKind(filters),filters,rule))
+
+	def query(self):
+		'''
+		[Description]
+			Return a lazy query on this grid (see query.Query). Filters, projections and sorts are collected and run in a
+			single pass when the query is collected, without building intermediate Grids, e.g.
+				grid.query()[{'TWS':'>6'}][{'config':'upwind'}][['TWS','Vs']].sort('Vs').collect()
+		[Arguments]
+			->return (Query): Empty query.
+		'''
+		return Query(self)
+
+	def groupBy(self,fields):
+		'''
+		[Description]
+			Group grid rows by the values of given fields in a single pass (see groupby.GroupBy), e.g.
+				grid.groupBy(['TWS','TWA']).agg([('Vs','max'),('Total_Fx',['mean','min'])])
+				for (tws,twa),group in grid.groupBy(['TWS','TWA']): ...
+		[Arguments]
+			fields (str/list[str]): Field name or list of field names.
+			->return (GroupBy): Grouped rows.
+		'''
+		return GroupBy(self,fields)
+
+	def join(self,other,on,how='inner',suffix='_other'):
+		'''
+		[Description]
+			Join rows of this grid with the rows of other grid that have equal values of given key fields (hash join), e.g.
+				forces.join(polars,on=['TWS','TWA'],how='left')
+			Resulting grid has the fields of this grid followed by the non key fields of other grid. Rows keep the order of
+			this grid (rows of other grid with the same key, in their order), unmatched rows of other grid go last in outer joins.
+			The hash table is built on the smaller grid and the larger one probes it. Other grid can also be given as an
+			iterable of Grids (e.g. Grid.iterChunks(path)), which is streamed chunk by chunk against a hash table of this grid,
+			so that only the rows of other grid used in the result are kept in memory.
+		[Arguments]
+			other (Grid/iterable[Grid]): Grid to join with, or sequence of Grids with the same header.
+			on (str/list[str]): Key field(s), present in both grids.
+			*how (str): inner --> Only rows with matches in both grids.
+						left --> All rows of this grid, with None values for the fields of other grid when there is no match.
+						outer --> All rows of both grids, with None values for missing fields.
+			*suffix (str): Suffix added to non key fields of other grid that are also fields of this grid.
+			->return (Grid): Joined grid.
+		'''
+		if type(on) != list:
+			on = [on]
+		if how not in ('inner','left','outer'):
+			raise ValueError('ERROR [Grid|join]: Unknown join type '+str(how))
+		left,right = [],[] # positions of joined rows in this grid and in other grid (None when missing)
+		if isinstance(other,Grid) and len(other) < len(self):
+			# build on other grid, probe with this grid
+			rightGrid = other
+			index = other._getIndex(on) or HashIndex(on)
+			if index.isStale():
+				index.build(other._indexColumns(index))
+			matched = bytearray(len(other))
+			keys = self._indexColumns(index)
+			for position,key in enumerate(keys[0] if len(keys) == 1 else izip(*keys)):
+				matches = index.lookup(key)
+				if len(matches) > 0:
+					left.extend([position]*len(matches))
+					right.extend(matches)
+					for match in matches:
+						matched[match] = 1
+				elif how != 'inner':
+					left.append(position)
+					right.append(None)
+			unmatched = [position for position in xrange(len(other)) if not matched[position]]
+		else:
+			# build on this grid, probe with (streamed) other grid
+			chunks = iter([other]) if isinstance(other,Grid) else iter(other)
+			chunk = next(chunks,None)
+			header = [] if chunk == None else chunk.header
+			index = self._getIndex(on) or HashIndex(on)
+			if index.isStale():
+				index.build(self._indexColumns(index))
+			rightColumns = [[] for field in header] # rows of other grid used in the result
+			buckets = [None]*len(self) # rows of other grid matching each row of this grid
+			unmatched = []
+			for chunk in ([] if chunk == None else chain([chunk],chunks)):
+				chunkColumns = [chunk._column(field) for field in header]
+				keys = chunk._indexColumns(index)
+				for position,key in enumerate(keys[0] if len(keys) == 1 else izip(*keys)):
+					matches = index.lookup(key)
+					if len(matches) == 0 and how != 'outer':
+						continue
+					row = len(rightColumns[0])
+					for column,values in izip(rightColumns,chunkColumns):
+						column.append(values[position])
+					if len(matches) == 0:
+						unmatched.append(row)
+					for match in matches:
+						if buckets[match] == None:
+							buckets[match] = [row]
+						else:
+							buckets[match].append(row)
+			for position,rows in enumerate(buckets):
+				if rows != None:
+					left.extend([position]*len(rows))
+					right.extend(rows)
+				elif how != 'inner':
+					left.append(position)
+					right.append(None)
+			rightGrid = self._fromColumns(rightColumns,header)
+		if how == 'outer':
+			left.extend([None]*len(unmatched))
+			right.extend(unmatched)
+		#build joined columns
+		otherFields = [field for field in rightGrid.header if field not in on]
+		columns = []
+		for field in self._schema:
+			column = self._column(field)
+			if field in on and how == 'outer' and len(unmatched) > 0:
+				otherColumn = rightGrid._column(field)
+				columns.append(_copyList([otherColumn[j] if i == None else column[i] for i,j in izip(left,right)]))
+			else:
+				columns.append(_copyList([None if i == None else column[i] for i in left]))
+		for field in otherFields:
+			column = rightGrid._column(field)
+			columns.append(_copyList([None if j == None else column[j] for j in right]))
+		header = self.header+[field+suffix if field in self.fieldIndex else field for field in otherFields]
+		return self._fromColumns(columns,header)
+
+	def _filterKind(self,filters):
+		'''
+		Ensure filter values are lists and return the type of filters: value/expression/function.
+		'''
 		#ensure filters values are lists
 		for key in filters:
 			if type(filters[key]) != list:
@@ -789,24 +1995,58 @@ class Grid(object):
 		filterSample = filters[filters.keys()[0]][0]
 		if type(filterSample) == str:
 			#check if filter is value or expression
-			if filterSample[0] == '>' or filterSample[0] == '<' or filterSample[0:2] == '!=':
-				filterFunc = '_filter_expression'
-			else:
-				filterFunc = '_filter_value'
+			if isExpression(filterSample):
+				return 'expression'
+			return 'value'
 		elif callable(filterSample):
-			filterFunc = '_filter_function'
-		else:
-			filterFunc = '_filter_value'
+			return 'function'
+		return 'value'
+
+	def _filterPositions(self,kind,filters,rule,positions=None):
+		'''
+		[Description]
+			Return positions of rows that pass the given filters.
+		[Arguments]
+			kind (str): Type of filters, value/expression/function (see _filterKind).
+			filters (dict): Filters, with values given as lists (see filter).
+			rule (str): OR/AND (see filter).
+			*positions (list[int]): Check only rows at these positions (in ascending order). By default all rows are checked.
+			->return (list[int]): Positions of rows that pass the filters, in ascending order.
+		'''
+		#function filters are given whole rows
+		if kind == 'function' and positions != None:
+			subset = self._take(positions)
+			subset.workers = self.workers
+			return [positions[i] for i in subset._filterPositions(kind,filters,rule)]
+		#use indexes for value and expression filters
+		indexed = None
+		if kind == 'value' and len(self._indexes) > 0:
+			indexed = self._indexedPositions(filters,rule)
+		elif kind == 'expression' and len(self._indexes) > 0:
+			indexed = self._sortedPositions(filters,rule)
+		if indexed != None:
+			if positions == None:
+				return indexed
+			indexed = set(indexed)
+			return [i for i in positions if i in indexed]
 		#
+		if kind == 'function':
+			maskFunc = self._mask_function
+		elif kind == 'value':
+			maskFunc = partial(self._mask_value,positions=positions)
+		else:
+			maskFunc = partial(self._mask_expression,positions=positions)
 		if rule == 'OR':
-			return self.__getattribute__(filterFunc)(filters)
+			mask = maskFunc(filters)
 		elif rule == 'AND':
 			for i,afilter in enumerate(filters):
 				if i == 0:
-					grid = self.__getattribute__(filterFunc)({afilter:filters[afilter]})
+					mask = maskFunc({afilter:filters[afilter]})
 				else:
-					grid = grid.__getattribute__(filterFunc)({afilter:filters[afilter]})
-			return Grid(grid.asList(),header=self.header)
+					mask = maskAnd(mask,maskFunc({afilter:filters[afilter]}))
+		if positions == None:
+			return maskIndices(mask)
+		return [positions[i] for i in maskIndices(mask)]
 
 	def _filter_value(self,filters):
 		'''
@@ -815,19 +2055,7 @@ class Grid(object):
 		Arguments:
 			filters (dict): Filters defined as {field1/index:[value1, value2, value3], field2/index:[value1]}.
 		'''
-		#filter grid
-		filteredGrid = []
-		for row in self.grid:
-			exit = False
-			i = 0
-			while i < len(filters) and exit == False:
-				field = filters.keys()[i]
-				for val in filters[field]:
-					if row[field] == val:
-						filteredGrid.append(row.elements)
-						exit = True
-				i += 1
-		return Grid(filteredGrid,header=self.header)
+		return self._take(maskIndices(self._mask_value(filters)))
 
 	def _filter_function(self,funcs,*args):
 		'''
@@ -835,44 +2063,60 @@ class Grid(object):
 			Retruns a subset of the grid that satisfiess the given functions.
 		[Arguments]:
 			funcs (dict['funcs':[funcs],'args':[args]]): List of functions. Functions are given GridRows and should return True
-														if row is to be kept.
+														if row is to be kept. Vectorized functions are evaluated for all rows at once.
 			funcs (list[funcs]):
 			*args (list[misc]):
 		'''
-		if type(funcs) == dict:
-			args = funcs.get('args',[])
-			funcs = funcs['funcs']
-		filteredGrid = []
-		for row in self.grid:
-			for func in funcs:
-				if func(row,*args) == True:
-					filteredGrid.append(row.elements)
-					break
-		return Grid(filteredGrid,header=self.header)
+		return self._take(maskIndices(self._mask_function(funcs,*args)))
 
 	def _filter_expression(self,filters):
 		'''
 		[Description]
 			Returns a subset of the grid that satisfies the given expressions.
 		[Arguments]
-			filters (dict): {field/index:[expressions]}. Expressions are strings to be concatenated with
-								grid row field value to produce an expression that is evaluated.
+			filters (dict): {field/index:[expressions]}. Expressions are strings that are compared with grid row field value
+								(see expressions module), e.g. '<5', '>=2.5', '!=upwind', '[2,5)' or 'in (6,8,10)'.
 								E.g. expression = '<5' and corresponding grid row value = 10 will yield 10<5 which
 								would return False and therefore such row would not be appended to filtered grid.
 		'''
-		#filter grid
-		filteredGrid = []
-		for row in self.grid:
-			exit = False
-			i = 0
-			while i < len(filters) and exit == False:
-				field = filters.keys()[i]
-				for expression in filters[field]:
-					if eval(str(row[field])+expression) == True:
-						filteredGrid.append(row.elements)
-						exit = True
-				i += 1
-		return Grid(filteredGrid,header=self.header)
+		return self._take(maskIndices(self._mask_expression(filters)))
+
+	def _mask_value(self,filters,positions=None):
+		'''
+		Return mask of rows (all rows or rows at given positions) that match any of the given values (see _filter_value).
+		'''
+		mask = [False]*(len(self) if positions == None else len(positions))
+		for field in filters.keys():
+			mask = maskOr(mask,valueMask(self._column(field,positions),filters[field]))
+		return mask
+
+	def _mask_function(self,funcs,*args):
+		'''
+		Return mask of rows that satisfy any of the given functions (see _filter_function).
+		'''
+		if type(funcs) == dict:
+			args = funcs.get('args',[])
+			funcs = funcs['funcs']
+		mask = [False]*len(self)
+		for func in funcs:
+			if isinstance(func,Vectorized):
+				values = func.evaluate(self,*args)
+			else:
+				values = self._applyRows(func,args)
+			mask = maskOr(mask,map(partial(operator.eq,True),values))
+		return mask
+
+	def _mask_expression(self,filters,positions=None):
+		'''
+		Return mask of rows (all rows or rows at given positions) that satisfy any of the given expressions (see _filter_expression).
+		Each expression is parsed once and checked against the whole column.
+		'''
+		mask = [False]*(len(self) if positions == None else len(positions))
+		for field in filters.keys():
+			column = self._column(field,positions)
+			for expression in filters[field]:
+				mask = maskOr(mask,expressionMask(column,expression))
+		return mask
 
 	# plotting
 
@@ -895,9 +2139,9 @@ class Grid(object):
 		[Description]
 			Basic contour plot of given fields.
 		[Arguments]
-			xField (str): Name of field to use as X values.		
+			xField (str): Name of field to use as X values.
 			yField (str): Name of field to use as Y values.
-			zField (str): Name of field to use as Z values.			
+			zField (str): Name of field to use as Z values.
 			*args (misc): Args passed to pyVeo.static.contour()
 			**kwargs (misc): Kwargs passed to pyVeo.static.contour()
 			->return (matplotlib.ax): Matplotlib figure axes.
@@ -910,7 +2154,7 @@ class Grid(object):
 		[Description]
 			Basic 3D plot of given fields.
 		[Arguments]
-			xField (str): Name of field to use as X values.		
+			xField (str): Name of field to use as X values.
 			yField (str): Name of field to use as Y values.
 			zField (str): Name of field to use as Z values.
 			*args (misc): Args passed to pyVeo.static.basic3D()
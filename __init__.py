@@ -1 +1,3 @@
-from .Grid import Grid
\ No newline at end of file
+from .Grid import Grid
+from .lazy import LazyGrid
+from .vectorized import Vectorized
@@ -0,0 +1,155 @@
+import json
+import mmap
+import struct
+try:
+	import numpy as np
+	_HAS_NUMPY = True
+except ImportError:
+	_HAS_NUMPY = False
+
+'''
+Binary columnar file format used by Grid.saveBinary and Grid.loadBinary. Each column is stored as a contiguous block, so
+that any subset of columns can be read without touching the rest of the file:
+	DATYBIN1							--> Magic (8 bytes).
+	block 1, block 2, ..., block N		--> One block per column, aligned to 8 bytes.
+	metadata							--> JSON: {'rows':nRows,'columns':[{'field','type','offset','size'},...]}.
+	metadata offset, DATYBIN1			--> Little-endian uint64 and magic (16 bytes).
+Column types are:
+	float	--> float64 values (little-endian).
+	int		--> int64 values (little-endian).
+	bool	--> One byte per value.
+	str		--> Strings separated by null characters.
+	json	--> JSON list with any other column (strings, None, lists, mixed types...).
+'''
+
+_MAGIC = 'DATYBIN1'
+_ALIGNMENT = 8
+_CHUNK = 65536 # values packed at once when NumPy is not available
+# struct format and numpy dtype of each typed block.
+_FORMATS = {'float':('d','<f8'),'int':('q','<i8'),'bool':('?','|b1')}
+_INT64 = (-2**63,2**63-1)
+
+def _columnType(column):
+	'''
+	Return block type of a column.
+	'''
+	types = set(map(type,column))
+	if len(column) == 0:
+		return 'json'
+	if types == set([float]):
+		return 'float'
+	if types <= set([int,long]) and _INT64[0] <= min(column) and max(column) <= _INT64[1]:
+		return 'int'
+	if types == set([bool]):
+		return 'bool'
+	if types == set([str]) and '\0' not in ''.join(column):
+		return 'str'
+	return 'json'
+
+def _encode(column,columnType):
+	'''
+	Return column block as a string.
+	'''
+	if columnType == 'json':
+		return json.dumps(column)
+	if columnType == 'str':
+		return '\0'.join(column)
+	code,dtype = _FORMATS[columnType]
+	if _HAS_NUMPY:
+		return np.array(column,dtype=dtype).tostring()
+	return ''.join([struct.pack('<'+str(len(chunk))+code,*chunk)
+					for chunk in [column[i:i+_CHUNK] for i in xrange(0,len(column),_CHUNK)]])
+
+def _asStr(value):
+	'''
+	Turn unicode strings returned by json into str (recursively for lists and dicts).
+	'''
+	if type(value) == unicode:
+		return value.encode('utf-8')
+	if type(value) == list:
+		return [_asStr(element) for element in value]
+	if type(value) == dict:
+		return dict([(_asStr(key),_asStr(element)) for key,element in value.items()])
+	return value
+
+def _decode(data,offset,size,rows,columnType):
+	'''
+	Return column from its block, given the file data (string or memory map).
+	'''
+	if columnType == 'json':
+		column = json.loads(data[offset:offset+size])
+		if set(map(type,column)) <= set([float,int,long,bool,type(None)]):
+			return column
+		return [_asStr(value) for value in column]
+	if columnType == 'str':
+		return data[offset:offset+size].split('\0') if rows > 0 else []
+	code,dtype = _FORMATS[columnType]
+	if _HAS_NUMPY:
+		return np.frombuffer(data,dtype=dtype,count=rows,offset=offset).tolist()
+	column = []
+	for start in xrange(0,rows,_CHUNK):
+		count = min(_CHUNK,rows-start)
+		column.extend(struct.unpack_from('<'+str(count)+code,data,offset+start*struct.calcsize(code)))
+	return column
+
+def write(path,fields,columns):
+	'''
+	[Description]
+		Write columns to a binary file.
+	[Arguments]
+		path (str): Path to save file.
+		fields (list[str]): Field name of each column.
+		columns (list[list[misc]]): Columns.
+	'''
+	metadata = {'rows':len(columns[0]) if len(columns) > 0 else 0,'columns':[]}
+	with open(path,'wb') as f:
+		f.write(_MAGIC)
+		offset = len(_MAGIC)
+		for field,column in zip(fields,columns):
+			columnType = _columnType(column)
+			block = _encode(column,columnType)
+			metadata['columns'].append({'field':field,'type':columnType,'offset':offset,'size':len(block)})
+			padding = -len(block)%_ALIGNMENT
+			f.write(block+'\0'*padding)
+			offset += len(block)+padding
+		f.write(json.dumps(metadata))
+		f.write(struct.pack('<Q',offset)+_MAGIC)
+
+def read(path,fields=None,memoryMap=True):
+	'''
+	[Description]
+		Read columns from a binary file. Only the blocks of the requested columns are read.
+	[Arguments]
+		path (str): Path to file.
+		*fields (list[str]): Fields to read. By default all of them are read.
+		*memoryMap (bool): Memory map the file, so that blocks are decoded straight from the OS page cache and only the pages
+							of the requested columns are loaded. Otherwise each block is read with a regular file read.
+		->return (tuple): Field names and columns, (list[str],list[list[misc]]).
+	'''
+	with open(path,'rb') as f:
+		f.seek(-16,2)
+		end = f.tell()
+		metadataOffset,magic = struct.unpack('<Q',f.read(8))[0],f.read(8)
+		if magic != _MAGIC:
+			raise ValueError('ERROR [binary|read]: Not a Grid binary file '+str(path))
+		f.seek(metadataOffset)
+		metadata = json.loads(f.read(end-metadataOffset))
+		blocks = dict([(_asStr(block['field']),block) for block in metadata['columns']])
+		if fields == None:
+			fields = [_asStr(block['field']) for block in metadata['columns']]
+		for field in fields:
+			if field not in blocks:
+				raise KeyError('ERROR [binary|read]: Field '+str(field)+' not found in '+str(path))
+		rows = metadata['rows']
+		if memoryMap:
+			data = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+			try:
+				columns = [_decode(data,blocks[field]['offset'],blocks[field]['size'],rows,blocks[field]['type']) for field in fields]
+			finally:
+				data.close()
+		else:
+			columns = []
+			for field in fields:
+				f.seek(blocks[field]['offset'])
+				columns.append(_decode(f.read(blocks[field]['size']),0,blocks[field]['size'],rows,blocks[field]['type']))
+	return fields,columns
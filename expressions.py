@@ -0,0 +1,91 @@
+import operator
+import re
+from functools import partial
+# Utils.
+from utils import dynamicTyped
+
+'''
+Filter expressions mini-language used by Grid filters. Expressions are strings compared against each value of a field:
+	'<5', '<=5', '>2.5', '>=2.5', '==x', '!=x'	--> Comparison with a value.
+	'[2,5]', '(2,5)', '[2,5)', '(2,5]'			--> Value within a closed ([]) or open (()) range.
+	'in (a,b,c)', 'not in (a,b,c)'				--> Value is (not) one of the given values.
+Values are typed with dynamicTyped, so '5' is a number, 'True' a bool, 'None' is None and anything else a string.
+'''
+
+# Comparison operators, two character ones first. Predicates are built as partial(function,value)(x) = function(value,x).
+_COMPARISONS = [('<=',operator.ge),('>=',operator.le),('==',operator.eq),('!=',operator.ne),('<',operator.gt),('>',operator.lt)]
+_RANGE = re.compile(r'^\s*([\[\(])([^,]+),([^,]+)([\]\)])\s*$')
+_MEMBERSHIP = re.compile(r'^\s*(not\s+)?in\s*[\(\[\{](.*)[\)\]\}]\s*$')
+
+def isExpression(expression):
+	'''
+	[Description]
+		Check if a filter is an expression (see module description) rather than a value.
+	[Arguments]
+		expression (misc): Filter to check.
+		->return (bool): True if filter is an expression string.
+	'''
+	if type(expression) != str:
+		return False
+	for symbol,function in _COMPARISONS:
+		if expression.startswith(symbol):
+			return True
+	return _RANGE.match(expression) != None or _MEMBERSHIP.match(expression) != None
+
+def parseExpression(expression):
+	'''
+	[Description]
+		Parse an expression (see module description) into a tuple describing it:
+			('compare',function,value) --> Comparison, true when function(value,x).
+			('range',lowerFunction,lower,upperFunction,upper) --> Range, true when lowerFunction(lower,x) and upperFunction(upper,x).
+			('in',negate,values) --> Membership, true when x is (not if negate) in values.
+	[Arguments]
+		expression (str): Expression to parse, e.g. '<5'.
+		->return (tuple): Parsed expression.
+	'''
+	# comparison
+	for symbol,function in _COMPARISONS:
+		if expression.startswith(symbol):
+			operand = expression[len(symbol):].strip()
+			if operand == '':
+				raise ValueError('ERROR [expressions|parseExpression]: Missing value in expression '+expression)
+			return ('compare',function,dynamicTyped(operand))
+	# range
+	match = _RANGE.match(expression)
+	if match != None:
+		lowerBracket,lower,upper,upperBracket = match.groups()
+		return ('range',operator.le if lowerBracket == '[' else operator.lt,dynamicTyped(lower.strip()),
+				operator.ge if upperBracket == ']' else operator.gt,dynamicTyped(upper.strip()))
+	# membership
+	match = _MEMBERSHIP.match(expression)
+	if match != None:
+		negate,values = match.groups()
+		return ('in',bool(negate),[dynamicTyped(value.strip()) for value in values.split(',')])
+	raise ValueError('ERROR [expressions|parseExpression]: Invalid expression '+str(expression))
+
+def compileExpression(expression):
+	'''
+	[Description]
+		Turn an expression (see module description) into a predicate function.
+	[Arguments]
+		expression (str/tuple): Expression string, e.g. '<5', or expression already parsed with parseExpression.
+		->return (function): Predicate f(value) = True/False.
+	'''
+	if type(expression) == str:
+		expression = parseExpression(expression)
+	if expression[0] == 'compare':
+		return partial(expression[1],expression[2])
+	elif expression[0] == 'range':
+		lowerCheck = partial(expression[1],expression[2])
+		upperCheck = partial(expression[3],expression[4])
+		return lambda value: lowerCheck(value) and upperCheck(value)
+	else:
+		negate,values = expression[1:]
+		valueSet = set([value for value in values if not isinstance(value,list)])
+		def predicate(value):
+			try:
+				found = value in valueSet
+			except TypeError: # unhashable values (lists)
+				found = value in values
+			return found != negate
+		return predicate
@@ -0,0 +1,228 @@
+from itertools import izip
+try:
+	import numpy as np
+except ImportError:
+	pass # numericArray returns None without NumPy, so numpy reducers are never used.
+# Utils.
+from utils import _copyList
+from indexes import _hashable
+from stats import _isNull
+from vectorized import numericArray
+
+'''
+Hash based grouping and aggregation of Grid rows, see Grid.groupBy. Rows are assigned to groups in a single pass over the
+key columns and each aggregation is then computed in a single pass over its column (vectorized with NumPy for numeric
+columns when available).
+'''
+
+# Built-in reducers: f(groupIds,column,groupBy) -> list with one value per group. sum, mean, min and max skip null (None/NaN)
+# values, as Grid.stats, and give None for groups without non null values.
+
+def _count(ids,column,groupBy):
+	counts = [0]*len(groupBy)
+	for gid in ids:
+		counts[gid] += 1
+	return counts
+
+def _sumCount(ids,column,groupBy):
+	'''
+	Return sum and number of non null (None/NaN) values of each group. Sum is None for groups without non null values.
+	'''
+	array = numericArray(column)
+	if array is not None:
+		valid = array == array # NaN values are not equal to themselves
+		counts = np.bincount(groupBy._idArray()[valid],minlength=len(groupBy)).tolist()
+		if array.dtype.kind == 'f':
+			sums = np.bincount(groupBy._idArray(),weights=np.where(valid,array,0.0),minlength=len(groupBy)).tolist()
+		else:
+			sums = np.zeros(len(groupBy),dtype=array.dtype)
+			np.add.at(sums,groupBy._idArray(),array)
+			sums = sums.tolist()
+		return [total if count > 0 else None for total,count in izip(sums,counts)],counts
+	sums = [None]*len(groupBy)
+	counts = [0]*len(groupBy)
+	for gid,value in izip(ids,column):
+		if not _isNull(value):
+			sums[gid] = value if counts[gid] == 0 else sums[gid]+value
+			counts[gid] += 1
+	return sums,counts
+
+def _sum(ids,column,groupBy):
+	return _sumCount(ids,column,groupBy)[0]
+
+def _mean(ids,column,groupBy):
+	return [float(total)/count if count > 0 else None for total,count in izip(*_sumCount(ids,column,groupBy))]
+
+def _extreme(ufuncName,better):
+	'''
+	Return min/max reducer, null (None/NaN) values are skipped.
+	'''
+	def reducer(ids,column,groupBy):
+		array = numericArray(column)
+		if array is not None:
+			values = array[groupBy._first]
+			getattr(np,ufuncName).at(values,groupBy._idArray(),array) # fmin/fmax only give NaN when all values are NaN
+			return [None if value != value else value for value in values.tolist()]
+		values = [None]*len(groupBy)
+		for gid,value in izip(ids,column):
+			if not _isNull(value) and (values[gid] is None or better(value,values[gid])):
+				values[gid] = value
+		return _copyList(values)
+	return reducer
+
+def _first(ids,column,groupBy):
+	return _copyList([column[i] for i in groupBy._first])
+
+def _last(ids,column,groupBy):
+	last = [0]*len(groupBy)
+	for position,gid in enumerate(ids):
+		last[gid] = position
+	return _copyList([column[i] for i in last])
+
+_REDUCERS = {
+	'count':_count,
+	'sum':_sum,
+	'mean':_mean,
+	'min':_extreme('fmin',lambda value,current: value < current),
+	'max':_extreme('fmax',lambda value,current: value > current),
+	'first':_first,
+	'last':_last,
+}
+
+class GroupBy(object):
+	'''
+	Rows of a Grid grouped by the values of one or several fields, created with Grid.groupBy(fields).
+	Groups are kept in order of first appearance. Grid must not be modified while the GroupBy is in use.
+	'''
+	def __init__(self,grid,fields):
+		if type(fields) != list:
+			fields = [fields]
+		self._grid = grid
+		self.fields = [grid._schema.fields[field] if type(field) == int else field for field in fields]
+		columns = [grid._column(field) for field in self.fields]
+		keys = columns[0] if len(columns) == 1 else zip(*columns)
+		try:
+			self._ids,self._first = self._assign(keys)
+		except TypeError: # unhashable keys (lists)
+			self._ids,self._first = self._assign([_hashable(key) for key in keys])
+		self._idsArray = None
+		self._countsList = None
+
+	def __len__(self):
+		'''
+		Number of groups.
+		'''
+		return len(self._first)
+
+	def __iter__(self):
+		'''
+		Iterate across groups as (key,Grid) tuples, where key is the value of group fields (a tuple for several fields).
+		'''
+		positions = [[] for gid in xrange(len(self))]
+		for position,gid in enumerate(self._ids):
+			positions[gid].append(position)
+		for key,rows in izip(self.keys(),positions):
+			yield key,self._grid._take(rows)
+
+	def __repr__(self):
+		return 'GroupBy '+str(self.fields)+': '+str(len(self))+' groups'
+
+	# Private
+
+	@staticmethod
+	def _assign(keys):
+		'''
+		Return the group id of each row and the position of the first row of each group.
+		'''
+		groups = {}
+		ids = []
+		first = []
+		for position,key in enumerate(keys):
+			gid = groups.get(key)
+			if gid is None:
+				gid = groups[key] = len(first)
+				first.append(position)
+			ids.append(gid)
+		return ids,first
+
+	def _idArray(self):
+		'''
+		Group ids as a numpy array (only used by vectorized reducers).
+		'''
+		if self._idsArray is None:
+			self._idsArray = np.array(self._ids,dtype=int)
+		return self._idsArray
+
+	def _counts(self):
+		'''
+		Number of rows of each group.
+		'''
+		if self._countsList is None:
+			self._countsList = _count(self._ids,None,self)
+		return self._countsList
+
+	# Public
+
+	def keys(self):
+		'''
+		Return the value of group fields for each group (tuples when grouping by several fields).
+		'''
+		columns = [self._grid._column(field) for field in self.fields]
+		if len(columns) == 1:
+			return _copyList([columns[0][i] for i in self._first])
+		return [tuple(_copyList([column[i] for column in columns])) for i in self._first]
+
+	def agg(self,aggregations):
+		'''
+		[Description]
+			Aggregate the rows of each group into a new Grid with one row per group: group fields followed by the aggregated
+			fields, e.g.
+				grid.groupBy(['TWS','TWA']).agg([('Vs','max'),('Total_Fx',['mean','min']),('config','count')])
+		[Arguments]
+			aggregations (list[tuple]/OrderedDict/dict): [(field/index,aggregation)] or [(field/index,[aggregations])], or the
+								same as a dict. Aggregated fields are added in the given order (header order for plain
+								dicts). Aggregations are:
+									str --> Built-in reducer: count, sum, mean, min, max, first or last.
+									callable --> Custom reducer f(values) -> value, given the list of field values of each group.
+								Aggregated fields keep their name when given a single aggregation, otherwise they are named
+								field_aggregation (e.g. Total_Fx_mean, where custom reducers use their function name).
+			->return (Grid): Aggregated grid.
+		'''
+		header = list(self.fields)
+		columns = [list(column) for column in zip(*self.keys())] if len(self.fields) > 1 else [self.keys()]
+		if len(self) == 0:
+			columns = [[] for field in self.fields]
+		ordered = type(aggregations) != dict
+		if isinstance(aggregations,dict):
+			aggregations = aggregations.items()
+		aggregations = [(self._grid._schema.fields[field] if type(field) == int else field,reducers) for field,reducers in aggregations]
+		if not ordered:
+			aggregations.sort(key=lambda (field,reducers): self._grid._schema.fieldIndex.get(field))
+		for field,reducers in aggregations:
+			column = self._grid._column(field)
+			single = type(reducers) != list
+			for reducer in ([reducers] if single else reducers):
+				if callable(reducer):
+					name = reducer.__name__
+					values = [[] for gid in xrange(len(self))]
+					for gid,value in izip(self._ids,column):
+						values[gid].append(value)
+					columns.append(_copyList(map(reducer,values)))
+				elif reducer in _REDUCERS:
+					name = reducer
+					if reducer == 'count':
+						columns.append(list(self._counts()))
+					else:
+						columns.append(_REDUCERS[reducer](self._ids,column,self))
+				else:
+					raise ValueError('ERROR [GroupBy|agg]: Unknown aggregation '+str(reducer))
+				header.append(field if single else field+'_'+name)
+		return self._grid._fromColumns(columns,header)
+
+	def count(self):
+		'''
+		Return a Grid with group fields and the number of rows of each group (count field).
+		'''
+		grid = self.agg({})
+		grid['count'] = list(self._counts())
+		return grid
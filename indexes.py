@@ -0,0 +1,426 @@
+import operator
+from bisect import bisect_left, bisect_right
+from itertools import imap, islice, izip
+
+'''
+Grid column indexes. Indexes are created and kept up to date by Grid (see Grid.createIndex), do not use them directly.
+SortOrder keeps track of the fields a Grid is sorted by in the same way.
+'''
+
+def _hashable(value):
+	'''
+	Return a hashable equivalent of value (lists are turned into tuples).
+	'''
+	if isinstance(value,(list,tuple)):
+		return tuple([_hashable(element) for element in value])
+	return value
+
+def _hasNaN(values):
+	'''
+	Check if any of the values is NaN (the only values that are not equal to themselves).
+	'''
+	return any(imap(operator.ne,values,values))
+
+class HashIndex(object):
+	'''
+	Hash map from the values of one field (or tuples of values of several fields, for composite indexes) to the positions
+	of the rows that hold them, in ascending order.
+	An index that can not be updated incrementally after a Grid change is marked as stale and rebuilt on next use.
+	'''
+	kind = 'hash'
+
+	def __init__(self,fields):
+		self.fields = tuple(fields)
+		self._positions = None
+
+	# Private
+
+	def _key(self,columns,position):
+		'''
+		Return index key of row at given position.
+		'''
+		if len(columns) == 1:
+			return columns[0][position]
+		return tuple([column[position] for column in columns])
+
+	def _add(self,key,position):
+		'''
+		Add position to the positions of key.
+		'''
+		try:
+			positions = self._positions.setdefault(key,[])
+		except TypeError: # unhashable key (lists)
+			positions = self._positions.setdefault(_hashable(key),[])
+		if len(positions) == 0 or positions[-1] < position:
+			positions.append(position)
+		else:
+			positions.append(position)
+			positions.sort()
+
+	# Public
+
+	def isStale(self):
+		'''
+		Return True if index must be rebuilt before being used.
+		'''
+		return self._positions is None
+
+	def invalidate(self):
+		'''
+		Mark index as stale.
+		'''
+		self._positions = None
+
+	def build(self,columns):
+		'''
+		[Description]
+			Build index from scratch.
+		[Arguments]
+			columns (list[list[misc]]): Grid columns of index fields, in the same order as index fields.
+		'''
+		self._positions = {}
+		self.extend(columns,0)
+
+	def extend(self,columns,start):
+		'''
+		[Description]
+			Add rows appended to the grid to the index.
+		[Arguments]
+			columns (list[list[misc]]): Grid columns of index fields, in the same order as index fields.
+			start (int): Position of first appended row.
+		'''
+		if self._positions is None:
+			return
+		positions = self._positions
+		if len(columns) == 1:
+			keys = columns[0][start:]
+		else:
+			keys = zip(*[column[start:] for column in columns])
+		for position,key in enumerate(keys,start):
+			try:
+				positions[key].append(position)
+			except KeyError:
+				positions[key] = [position]
+			except TypeError: # unhashable key (lists)
+				positions.setdefault(_hashable(key),[]).append(position)
+
+	def add(self,columns,position):
+		'''
+		Add row at given position (see extend for arguments).
+		'''
+		if self._positions is not None:
+			self._add(self._key(columns,position),position)
+
+	def remove(self,columns,position):
+		'''
+		Remove row at given position (see extend for arguments). Must be called before row values are modified.
+		'''
+		if self._positions is not None:
+			key = _hashable(self._key(columns,position))
+			positions = self._positions[key]
+			positions.remove(position)
+			if len(positions) == 0:
+				del self._positions[key]
+
+	def lookup(self,key):
+		'''
+		[Description]
+			Return positions of rows with given key.
+		[Arguments]
+			key (misc/tuple): Field value, or tuple of values (one for each index field) for composite indexes.
+			->return (list[int]): Row positions in ascending order.
+		'''
+		if key != key: # NaN is not equal to anything (not even to itself)
+			return []
+		try:
+			return self._positions.get(key,[])
+		except TypeError: # unhashable key (lists)
+			return self._positions.get(_hashable(key),[])
+
+class SortedIndex(object):
+	'''
+	Values of one field in ascending order, together with the positions of the rows that hold them, so that range
+	queries (<, >, between), min/max and sorting are answered with binary search instead of scanning the column.
+	Rows with equal values are kept in ascending position order (stable, as python sorts). NaN values are not indexed,
+	since they can not be ordered (and no comparison but != is true for them).
+	'''
+	kind = 'sorted'
+
+	def __init__(self,fields):
+		if len(fields) != 1:
+			raise ValueError('ERROR [SortedIndex]: Sorted indexes must have a single field, got '+str(list(fields)))
+		self.fields = tuple(fields)
+		self._values = None
+		self._order = None
+
+	def __len__(self):
+		return len(self._values)
+
+	@classmethod
+	def fromSorted(cls,fields,column):
+		'''
+		Return index of a column whose values are already in ascending order (e.g. a Grid sorted by the field), using the
+		column itself as sorted values. It is not kept up to date, so it must only be used right away.
+		Columns with NaN values are indexed from scratch instead, so that NaN values are left out as in build.
+		'''
+		index = cls(fields)
+		if _hasNaN(column):
+			index.build([column])
+			return index
+		index._values = column
+		index._order = range(len(column))
+		return index
+
+	# Private
+
+	def _span(self,value):
+		'''
+		Return (start,stop) of value in sorted values.
+		'''
+		return bisect_left(self._values,value),bisect_right(self._values,value)
+
+	def _insert(self,value,position):
+		'''
+		Insert value of row at given position.
+		'''
+		if value != value: # NaN
+			return
+		start,stop = self._span(value)
+		i = bisect_left(self._order,position,start,stop)
+		self._values.insert(i,value)
+		self._order.insert(i,position)
+
+	# Public
+
+	def isStale(self):
+		'''
+		Return True if index must be rebuilt before being used.
+		'''
+		return self._values is None
+
+	def invalidate(self):
+		'''
+		Mark index as stale.
+		'''
+		self._values = None
+		self._order = None
+
+	def build(self,columns):
+		'''
+		[Description]
+			Build index from scratch.
+		[Arguments]
+			columns (list[list[misc]]): Grid column of index field (as a single element list).
+		'''
+		column = columns[0]
+		self._order = sorted([i for i,value in enumerate(column) if value == value],key=column.__getitem__)
+		self._values = [column[i] for i in self._order]
+
+	def extend(self,columns,start):
+		'''
+		[Description]
+			Add rows appended to the grid to the index.
+		[Arguments]
+			columns (list[list[misc]]): Grid column of index field (as a single element list).
+			start (int): Position of first appended row.
+		'''
+		if self._values is None:
+			return
+		column = columns[0]
+		if (len(column)-start)*8 > len(self._values):
+			self.build(columns)
+		else:
+			for position in xrange(start,len(column)):
+				self._insert(column[position],position)
+
+	def add(self,columns,position):
+		'''
+		Add row at given position (see extend for arguments).
+		'''
+		if self._values is not None:
+			self._insert(columns[0][position],position)
+
+	def remove(self,columns,position):
+		'''
+		Remove row at given position (see extend for arguments). Must be called before row values are modified.
+		'''
+		if self._values is not None:
+			value = columns[0][position]
+			if value != value: # NaN
+				return
+			start,stop = self._span(value)
+			i = bisect_left(self._order,position,start,stop)
+			del self._values[i]
+			del self._order[i]
+
+	def lowest(self):
+		'''
+		Return smallest value (None if index is empty).
+		'''
+		return self._values[0] if len(self._values) > 0 else None
+
+	def highest(self):
+		'''
+		Return largest value (None if index is empty).
+		'''
+		return self._values[-1] if len(self._values) > 0 else None
+
+	def lookup(self,key):
+		'''
+		[Description]
+			Return positions of rows with given value.
+		[Arguments]
+			key (misc): Field value.
+			->return (list[int]): Row positions in ascending order.
+		'''
+		if key != key: # NaN
+			return []
+		start,stop = self._span(key)
+		return self._order[start:stop]
+
+	def lookupRange(self,lowerFunction=None,lower=None,upperFunction=None,upper=None):
+		'''
+		[Description]
+			Return positions of rows whose value x satisfies lowerFunction(lower,x) and upperFunction(upper,x), as in
+			parsed range expressions (see expressions.parseExpression).
+		[Arguments]
+			*lowerFunction (function): operator.le (x >= lower) or operator.lt (x > lower). None for no lower bound.
+			*lower (misc): Lower bound.
+			*upperFunction (function): operator.ge (x <= upper) or operator.gt (x < upper). None for no upper bound.
+			*upper (misc): Upper bound.
+			->return (list[int]): Row positions in ascending order.
+		'''
+		if lower != lower or upper != upper: # NaN
+			return []
+		start,stop = 0,len(self._values)
+		if lowerFunction == operator.le:
+			start = bisect_left(self._values,lower)
+		elif lowerFunction == operator.lt:
+			start = bisect_right(self._values,lower)
+		if upperFunction == operator.ge:
+			stop = bisect_right(self._values,upper)
+		elif upperFunction == operator.gt:
+			stop = bisect_left(self._values,upper)
+		return sorted(self._order[start:stop])
+
+	def ordered(self,reverse=False,limit=None):
+		'''
+		[Description]
+			Return row positions sorted by value, same as sorted(positions,key=column.__getitem__,reverse=reverse).
+			Index must hold every row of the grid (no NaN values).
+		[Arguments]
+			*reverse (bool): Descending order. Rows with equal values keep their ascending position order.
+			*limit (int/None): Return only the first limit positions.
+			->return (list[int]): Row positions.
+		'''
+		if not reverse:
+			return self._order[:limit]
+		order = []
+		stop = len(self._values)
+		while stop > 0 and (limit == None or len(order) < limit):
+			start = bisect_left(self._values,self._values[stop-1],0,stop)
+			order.extend(self._order[start:stop])
+			stop = start
+		return order[:limit]
+
+class SortOrder(object):
+	'''
+	Fields that Grid rows are sorted by (each one in ascending or descending order), as left by Grid.sort. It is kept up to
+	date like indexes: appended rows are checked against the previous ones and any other change marks it as stale, so that
+	the order is checked again in a single pass over the rows on next use.
+	'''
+	kind = 'order'
+
+	def __init__(self,fields,reverse):
+		self.fields = tuple(fields)
+		self.reverse = tuple(reverse)
+		self._sorted = None
+
+	# Private
+
+	def _check(self,columns,start):
+		'''
+		Return True if rows from given position on are sorted. Rows with NaN values are never sorted (NaN can not be ordered).
+		'''
+		if any([_hasNaN(column[start:] if start > 0 else column) for column in columns]):
+			return False
+		if len(columns) == 1:
+			keys = columns[0]
+		else:
+			keys = zip(*[column[start:] for column in columns])
+			start = 0
+		if len(set(self.reverse)) == 1:
+			compare = operator.ge if self.reverse[0] else operator.le
+			return all(imap(compare,islice(keys,start,None),islice(keys,start+1,None)))
+		# mixed ascending/descending fields
+		for previous,current in izip(keys,islice(keys,1,None)):
+			for a,b,reverse in izip(previous,current,self.reverse):
+				if a != b:
+					if (b < a) != reverse:
+						return False
+					break
+		return True
+
+	# Public
+
+	def isStale(self):
+		'''
+		Return True if order must be checked again before being used.
+		'''
+		return self._sorted is None
+
+	def invalidate(self):
+		'''
+		Mark order as stale.
+		'''
+		self._sorted = None
+
+	def isSorted(self):
+		'''
+		Return True if rows are sorted by order fields.
+		'''
+		return self._sorted == True
+
+	def assumeSorted(self):
+		'''
+		Mark rows as sorted (right after sorting them).
+		'''
+		self._sorted = True
+
+	def build(self,columns):
+		'''
+		[Description]
+			Check whether rows are sorted.
+		[Arguments]
+			columns (list[list[misc]]): Grid columns of order fields, in the same order as order fields.
+		'''
+		self._sorted = self._check(columns,0)
+
+	def extend(self,columns,start):
+		'''
+		[Description]
+			Check that rows appended to the grid keep the order.
+		[Arguments]
+			columns (list[list[misc]]): Grid columns of order fields, in the same order as order fields.
+			start (int): Position of first appended row.
+		'''
+		if self._sorted == True:
+			self._sorted = self._check(columns,max(start-1,0))
+
+	def add(self,columns,position):
+		'''
+		Check row appended at given position (see extend for arguments).
+		'''
+		self.extend(columns,position)
+
+	def remove(self,columns,position):
+		'''
+		Row at given position is going to be modified, order is marked as stale.
+		'''
+		self.invalidate()
+
+	def satisfies(self,fields,reverse):
+		'''
+		Return True if rows sorted by order fields are also sorted by given fields (the same ones or the first ones).
+		'''
+		return self.fields[:len(fields)] == tuple(fields) and self.reverse[:len(reverse)] == tuple(reverse)
@@ -0,0 +1,267 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import imap, islice
+try:
+	import numpy as np
+	_HAS_NUMPY = True
+except ImportError:
+	_HAS_NUMPY = False
+# Utils.
+from utils import iterParse, lineParser
+from Grid import Grid, GridRow
+
+'''
+Lazy, random-access Grids backed by csv files, see LazyGrid.
+'''
+
+_SCAN_BLOCK = 2**22 # bytes scanned at once when building line offsets with NumPy
+_INDEX_MAGIC = 'DATYIDX1'
+_WHITESPACE = ' \t\n\r\x0b\x0c'
+
+def _scanLines(data,size):
+	'''
+	[Description]
+		Return the byte offset of every non empty line (lines with only whitespace are empty, as in utils.iterParse).
+		Offsets are kept in an array of doubles, which represent them exactly (up to 2**53 bytes) using 8 bytes each on any
+		platform.
+	[Arguments]
+		data (mmap/str): File contents.
+		size (int): File size.
+		->return (array): Line offsets.
+	'''
+	offsets = array('d')
+	start = 0
+	while start < size:
+		if _HAS_NUMPY:
+			# cut block at a line end, so that no line is split across blocks
+			end = min(start+_SCAN_BLOCK,size)
+			if end < size:
+				cut = data.rfind('\n',start,end)
+				if cut == -1:
+					cut = data.find('\n',end)
+				end = size if cut == -1 else cut+1
+			block = np.frombuffer(data,dtype=np.uint8,count=end-start,offset=start)
+			newlines = np.flatnonzero(block == 10)
+			lineStarts = np.concatenate(([0],newlines+1))
+			lineEnds = np.concatenate((newlines,[len(block)]))
+			# non whitespace characters before each position, lines without any of them are empty
+			content = np.concatenate(([0],np.cumsum(~np.in1d(block,np.frombuffer(_WHITESPACE,dtype=np.uint8)),dtype=np.int64)))
+			lineStarts = lineStarts[content[lineEnds] > content[lineStarts]]
+			offsets.fromstring((lineStarts+start).astype(np.float64).tostring())
+			start = end
+		else:
+			end = data.find('\n',start)
+			end = size if end == -1 else end+1
+			if data[start:end].strip() != '':
+				offsets.append(start)
+			start = end
+	return offsets
+
+def _loadOffsets(indexPath,size,mtime):
+	'''
+	Return line offsets stored in sidecar index file, or None if it does not exist or does not match the csv file.
+	'''
+	if not os.path.exists(indexPath):
+		return None
+	with open(indexPath,'rb') as f:
+		magic = f.read(len(_INDEX_MAGIC))
+		if magic != _INDEX_MAGIC:
+			return None
+		indexSize,indexMtime,count = struct.unpack('<QdQ',f.read(24))
+		if indexSize != size or indexMtime != mtime:
+			return None
+		offsets = array('d')
+		offsets.fromfile(f,count)
+	if sys.byteorder == 'big':
+		offsets.byteswap()
+	return offsets
+
+def _saveOffsets(indexPath,size,mtime,offsets):
+	'''
+	Store line offsets in sidecar index file (magic, csv file size and modification time, number of offsets and offsets
+	as little-endian doubles).
+	'''
+	if sys.byteorder == 'big':
+		offsets = array('d',offsets)
+		offsets.byteswap()
+	with open(indexPath,'wb') as f:
+		f.write(_INDEX_MAGIC+struct.pack('<QdQ',size,mtime,len(offsets)))
+		offsets.tofile(f)
+
+class LazyGrid(Grid):
+	'''
+	Grid backed by a csv file that is only parsed when needed, e.g. to get a few rows of a very large file:
+		grid = LazyGrid(path)
+		grid[1000], grid[1000:1010], grid.head(), len(grid)
+	The file is scanned once to find the byte offset of each line (optionally stored in a sidecar index file, so that next
+	time the scan is skipped) and rows are parsed when accessed, with a LRU cache of parsed rows. Rows given by int, slice
+	and list of int indices are standalone GridRows/Grids (they are copies, modifying them does not modify the file grid).
+	Any other operation (columns, filters, modifications...) parses the whole file once and from then on the grid works
+	as a regular Grid.
+	'''
+
+	def __init__(self,path,header=True,cacheSize=1000,indexPath=None,**kwargs):
+		'''
+		[Arguments]
+			path (str): Path to csv file.
+			*header (list[str]/bool): Same as in Grid.__init__.
+			*cacheSize (int): Max number of parsed rows kept in cache.
+			*indexPath (str/None): Path to sidecar file with line offsets. It is created if it does not exist (or does not
+									match the csv file) and read otherwise. Set to None to scan the file without storing offsets.
+			**kwargs (dict): Kwargs passed to utils.iterParse() (and utils.lineParser()) functions in charge of parsing grid.
+		'''
+		self._initState()
+		self._data = None
+		self._path = path
+		self._kwargs = kwargs
+		self._cache = OrderedDict()
+		self._cacheSize = cacheSize
+		# map file and find line offsets
+		self._file = open(path,'rb')
+		size = os.fstat(self._file.fileno()).st_size
+		self._map = mmap.mmap(self._file.fileno(),0,access=mmap.ACCESS_READ) if size > 0 else ''
+		mtime = os.path.getmtime(path)
+		offsets = None if indexPath == None else _loadOffsets(indexPath,size,mtime)
+		if offsets == None:
+			offsets = _scanLines(self._map,size)
+			if indexPath != None:
+				_saveOffsets(indexPath,size,mtime,offsets)
+		self._offsets = offsets
+		# header and row parser
+		sampleSize = kwargs.get('sampleSize',100)
+		self._parseLines = lineParser(self._lines(0,min(sampleSize,len(offsets))),
+										**dict([(key,value) for key,value in kwargs.items() if key != 'blockSize']))
+		firstRows = self._parseLines(self._lines(0,min(2,len(offsets))))
+		nRows = len(firstRows)
+		self._initHeader(header,firstRows)
+		self._skip = nRows-len(firstRows) # header lines
+		# columns of empty header fields are removed, as in Grid.__init__
+		fields = self._schema.fields
+		self._fileColumns = len(fields)
+		self._keptColumns = [i for i,field in enumerate(fields) if field != None]
+		if len(self._keptColumns) < len(fields):
+			self._setSchema([fields[i] for i in self._keptColumns])
+		else:
+			self._keptColumns = None
+
+	def __len__(self):
+		'''
+		Returns length as number of GridRows (without parsing the file).
+		'''
+		if self._data != None:
+			return Grid.__len__(self)
+		return len(self._offsets)-self._skip
+
+	def __getitem__(self,index):
+		'''
+		Same as Grid.__getitem__. Int, slice and list of int indices only parse the given rows until grid is fully parsed.
+		'''
+		if self._data == None:
+			if type(index) == int:
+				return self.row(index)
+			elif type(index) == slice and type(index.start) in (int,type(None)) and type(index.stop) in (int,type(None)):
+				start,stop,step = index.indices(len(self))
+				if step == 1:
+					rows = self._parseLines(self._lines(self._skip+start,self._skip+max(start,stop)))
+					return Grid._fromColumns(self._asColumns(map(self._keepColumns,rows)),self._schema)
+				return self._rows(range(start,stop,step))
+			elif isinstance(index,list) and len(index) > 0 and type(index[0]) == int:
+				return self._rows(index)
+		return Grid.__getitem__(self,index)
+
+	# Private
+
+	@property
+	def _columns(self):
+		'''
+		Grid columns, the whole file is parsed on first access.
+		'''
+		if self._data == None:
+			self._load()
+		return self._data
+
+	@_columns.setter
+	def _columns(self,columns):
+		self._data = columns
+
+	def _load(self):
+		'''
+		Parse whole file into grid columns.
+		'''
+		with open(self._path,'r') as f:
+			rows = iterParse(f,**self._kwargs)
+			for i in xrange(self._skip):
+				next(rows)
+			if self._keptColumns != None:
+				rows = imap(self._keepColumns,rows)
+			self._data = self._asColumns(list(islice(rows,10000)))
+			self._extendColumns(rows)
+		self._cache.clear()
+
+	def _lines(self,start,stop):
+		'''
+		Return file lines with given line numbers (empty lines excluded).
+		'''
+		if start >= stop:
+			return []
+		end = self._map.find('\n',int(self._offsets[stop-1]))
+		return self._map[int(self._offsets[start]):len(self._map) if end == -1 else end].split('\n')
+
+	def _row(self,index):
+		'''
+		Return parsed row elements (row index must be positive and within grid). Parsed rows are cached.
+		'''
+		elements = self._cache.pop(index,None)
+		if elements == None:
+			line = self._skip+index
+			elements = self._keepColumns(self._parseLines(self._lines(line,line+1))[0])
+			if len(self._cache) >= self._cacheSize:
+				self._cache.popitem(last=False)
+		self._cache[index] = elements
+		return elements
+
+	def _keepColumns(self,elements):
+		'''
+		Return row elements without the columns of empty header fields (rows of other lengths are returned as they are).
+		'''
+		if self._keptColumns == None or len(elements) != self._fileColumns:
+			return elements
+		return [elements[i] for i in self._keptColumns]
+
+	def _rows(self,indices):
+		'''
+		Return Grid with rows at given indices.
+		'''
+		return Grid._fromColumns(self._asColumns([self.row(index)._values() for index in indices]),self._schema)
+
+	# Public
+
+	def row(self,index):
+		'''
+		Return GridRow by index (a standalone copy until grid is fully parsed).
+		'''
+		if self._data != None:
+			return Grid.row(self,index)
+		if index < 0:
+			index += len(self)
+		if index < 0 or index >= len(self):
+			raise IndexError('[LazyGrid|row]: Row index out of range')
+		return GridRow(self._row(index),self._schema)
+
+	def isLoaded(self):
+		'''
+		Return True if whole file has already been parsed.
+		'''
+		return self._data != None
+
+	def close(self):
+		'''
+		Close csv file. Rows that are not parsed yet can not be accessed after closing it.
+		'''
+		if isinstance(self._map,mmap.mmap):
+			self._map.close()
+		self._file.close()
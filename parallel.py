@@ -0,0 +1,174 @@
+import os
+from itertools import chain
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+# Utils.
+from utils import lineParser
+import binary
+
+'''
+Parallel parsing of csv files, see Grid(path,workers=N). The file is split on line boundaries into byte ranges that are
+parsed in a pool of processes. Every worker compiles the same column converters from the same sample lines, so all
+chunks are parsed with a consistent inferred schema, and chunks are reassembled in file order.
+Row functions (Grid.apply, function filters and callable columns) are evaluated over chunks of rows the same way, see
+mapRanges.
+'''
+
+_CHUNKS_PER_WORKER = 4 # byte ranges given to each worker, so that faster workers take over the remaining ranges
+
+def readSample(path,sampleSize=100):
+	'''
+	[Description]
+		Read the first non empty lines of a file.
+	[Arguments]
+		path (str): Path to file.
+		*sampleSize (int): Number of lines to read.
+		->return (tuple): Lines and the byte offset where each of them ends, (list[str],list[int]).
+	'''
+	lines = []
+	ends = []
+	with open(path,'rb') as f:
+		for line in iter(f.readline,''):
+			if line.strip() != '':
+				lines.append(line)
+				ends.append(f.tell())
+				if len(lines) >= sampleSize:
+					break
+	return lines,ends
+
+def byteRanges(path,start,parts):
+	'''
+	[Description]
+		Split a file from a given byte offset into consecutive byte ranges that begin and end on line boundaries.
+	[Arguments]
+		path (str): Path to file.
+		start (int): Offset where the first range begins (must be at the beginning of a line).
+		parts (int): Number of ranges (fewer are returned for small files).
+		->return (list[tuple]): (start,stop) of each range.
+	'''
+	size = os.path.getsize(path)
+	cuts = [start]
+	with open(path,'rb') as f:
+		for i in xrange(1,parts):
+			offset = start+(size-start)*i/parts
+			if offset <= cuts[-1]:
+				continue
+			f.seek(offset-1)
+			f.readline() # move to the beginning of next line
+			cuts.append(min(f.tell(),size))
+	cuts.append(size)
+	return [(lower,upper) for lower,upper in zip(cuts[:-1],cuts[1:]) if upper > lower]
+
+def _parseRange(args):
+	'''
+	Parse the lines of a byte range of a file in blocks of blockSize rows (run by pool workers). When all rows have nColumns
+	elements, columns are returned encoded as binary blocks (see binary module), which are much cheaper to send back to the
+	main process than pickled lists. Otherwise rows are returned as they are.
+	'''
+	path,start,stop,sample,nColumns,blockSize,kwargs = args
+	parseLines = lineParser(sample,**kwargs)
+	with open(path,'rb') as f:
+		f.seek(start)
+		lines = f.read(stop-start).split('\n')
+	columns = [[] for i in xrange(nColumns)]
+	rows = []
+	for i in xrange(0,len(lines),blockSize):
+		block = parseLines(lines[i:i+blockSize])
+		if len(rows) == 0 and set(map(len,block)) <= set([nColumns]):
+			for column,values in zip(columns,zip(*block)):
+				column.extend(values)
+		else:
+			rows.extend(block)
+	if len(rows) > 0:
+		return False,map(list,zip(*columns))+rows
+	blocks = []
+	for column in columns:
+		columnType = binary._columnType(column)
+		blocks.append((columnType,len(column),column if columnType == 'json' else binary._encode(column,columnType)))
+	return True,blocks
+
+def _decodeColumn(columnType,rows,block):
+	'''
+	Return column returned by _parseRange.
+	'''
+	if columnType == 'json':
+		return block
+	return binary._decode(block,0,len(block),rows,columnType)
+
+def iterParseParallel(path,start,sample,nColumns,workers,blockSize=1000,**kwargs):
+	'''
+	[Description]
+		Parse a file from a given byte offset in a pool of processes.
+	[Arguments]
+		path (str): Path to file.
+		start (int): Offset of the first line to parse.
+		sample (list[str]): First lines of the file (header included), used to compile column converters (see utils.lineParser).
+		nColumns (int): Expected number of columns.
+		workers (int): Number of processes.
+		*blockSize (int): Number of rows converted at once by each worker.
+		**kwargs (dict): Kwargs passed to utils.lineParser().
+		->return (generator[tuple]): In file order, (True,columns) for chunks where all rows have nColumns elements and
+										(False,rows) otherwise.
+	'''
+	ranges = byteRanges(path,start,workers*_CHUNKS_PER_WORKER)
+	if len(ranges) == 0:
+		return
+	pool = Pool(min(workers,len(ranges)))
+	try:
+		for rectangular,chunk in pool.imap(_parseRange,[(path,lower,upper,sample,nColumns,blockSize,kwargs) for lower,upper in ranges]):
+			if rectangular:
+				chunk = [_decodeColumn(columnType,rows,block) for columnType,rows,block in chunk]
+			yield rectangular,chunk
+		pool.close()
+	finally:
+		pool.terminate()
+		pool.join()
+
+# Functions run by process pool workers, by task id. Workers are forked after the function is registered, so they inherit
+# it (along with the Grid it reads) instead of receiving it pickled.
+_tasks = {}
+
+def _runTask(args):
+	'''
+	Run registered function over a range of rows (run by process pool workers).
+	'''
+	taskId,start,stop = args
+	return _tasks[taskId](start,stop)
+
+def mapRanges(function,size,workers,chunkSize=1000,pool='process'):
+	'''
+	[Description]
+		Evaluate a function over consecutive chunks of row positions in a pool, keeping row order.
+	[Arguments]
+		function (function): f(start,stop) -> list with one value per row position in [start,stop).
+		size (int): Number of rows.
+		workers (int): Number of processes/threads. Chunks are evaluated in the current process when it is 1.
+		*chunkSize (int): Number of rows given to a worker at once.
+		*pool (str): process --> Pool of forked processes. Function and its data are inherited by workers, so any
+									callable can be used (lambdas, closures...), but results must be picklable.
+					 thread --> Pool of threads, only faster for functions that release the GIL (I/O, NumPy, C extensions...).
+		->return (list): Values of all rows.
+	'''
+	ranges = [(start,min(start+chunkSize,size)) for start in xrange(0,size,chunkSize)]
+	if workers <= 1 or len(ranges) <= 1:
+		return list(chain.from_iterable([function(start,stop) for start,stop in ranges]))
+	if pool == 'thread':
+		workerPool = ThreadPool(min(workers,len(ranges)))
+		try:
+			chunks = workerPool.map(lambda bounds: function(*bounds),ranges,1)
+		finally:
+			workerPool.terminate()
+	elif pool == 'process':
+		taskId = max(_tasks.keys()+[0])+1
+		_tasks[taskId] = function
+		try:
+			workerPool = Pool(min(workers,len(ranges)))
+			try:
+				chunks = workerPool.map(_runTask,[(taskId,start,stop) for start,stop in ranges],1)
+			finally:
+				workerPool.terminate()
+		finally:
+			del _tasks[taskId]
+	else:
+		raise ValueError('ERROR [parallel|mapRanges]: Unknown pool '+str(pool))
+	return list(chain.from_iterable(chunks))
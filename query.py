@@ -0,0 +1,159 @@
+'''
+Lazy queries on Grids. A Query collects filters, projections and sorts and runs them in a single pass when collected:
+filters are ordered by their estimated selectivity and each one only checks the rows kept by the previous ones, rows are
+handled as positions and the resulting Grid is built once, with only the selected columns.
+'''
+
+# Max number of rows checked to estimate the selectivity of a filter.
+_SAMPLE_SIZE = 100
+
+class Query(object):
+	'''
+	Lazy query on a Grid, created with Grid.query(). Query methods return the query itself so that they can be chained:
+		grid.query()[{'TWS':'>6'}][{'config':'upwind'}][['TWS','Vs']].sort('Vs').collect()
+	Chained filters are combined with AND (as chained Grid filters are). Grid is read when the query is collected, so it
+	sees any change made to the grid after the query was created.
+	'''
+	def __init__(self,grid):
+		self._grid = grid
+		self._filters = [] # (kind,filters,rule)
+		self._fields = None
+		self._sorts = [] # (field,reverse)
+
+	def __getitem__(self,index):
+		'''
+		[Description]
+			Add a filter or a projection, as Grid.__getitem__ does.
+		[Arguments]
+			index (dict): Filter -> same as filter(index).
+			index (str/list[str]): Field names -> same as select(index).
+			->return (Query): Self.
+		'''
+		if type(index) == dict:
+			return self.filter(index)
+		elif type(index) == str or isinstance(index,list):
+			return self.select(index)
+		raise KeyError('[Query|__getitem__]: Type'+str(type(index))+'not supported.')
+
+	def __len__(self):
+		'''
+		Number of rows that pass query filters (no Grid is built).
+		'''
+		positions = self._positions()
+		return len(self._grid) if positions == None else len(positions)
+
+	def __repr__(self):
+		return 'Query\n'+self.explain()
+
+	# Private
+
+	def _selectivity(self,step):
+		'''
+		Estimate the fraction of rows kept by a filter step, checking it against an evenly spaced sample of grid rows.
+		Function filters are not sampled (they can be expensive), they are run last in the given order.
+		'''
+		kind,filters,rule = step
+		if kind == 'function' or len(self._grid) == 0:
+			return 1.0
+		sample = range(0,len(self._grid),max(1,len(self._grid)//_SAMPLE_SIZE))
+		return len(self._grid._filterPositions(kind,filters,rule,sample))/float(len(sample))
+
+	def _plan(self):
+		'''
+		Return filter steps in execution order, with their estimated selectivity: [(selectivity,step)].
+		'''
+		plan = [(self._selectivity(step),step) for step in self._filters]
+		plan.sort(key=lambda (selectivity,step): (step[0] == 'function',selectivity))
+		return plan
+
+	def _positions(self):
+		'''
+		Return positions of rows that pass query filters in ascending order, or None if there are no filters.
+		'''
+		positions = None
+		for selectivity,(kind,filters,rule) in self._plan():
+			positions = self._grid._filterPositions(kind,filters,rule,positions)
+			if len(positions) == 0:
+				break
+		return positions
+
+	# Public
+
+	def filter(self,filters,rule=None):
+		'''
+		[Description]
+			Add a filter (see Grid.filter).
+		[Arguments]
+			filters (dict): Filters.
+			*rule (None/str): OR/AND. Set to None for using grid defaultFilterRule.
+			->return (Query): Self.
+		'''
+		if rule == None:
+			rule = self._grid.defaultFilterRule
+		filters = dict(filters)
+		self._filters.append((self._grid._filterKind(filters),filters,rule))
+		return self
+
+	def select(self,fields):
+		'''
+		[Description]
+			Keep only given fields in the result.
+		[Arguments]
+			fields (str/list[str]): Field name or list of field names.
+			->return (Query): Self.
+		'''
+		if type(fields) != list:
+			fields = [fields]
+		self._fields = fields
+		return self
+
+	def sort(self,field,reverse=False):
+		'''
+		[Description]
+			Sort result by given field (see Grid.sort). Sorts are stable, so the last sort added is the primary one.
+		[Arguments]
+			field (str/int): Field name or column index.
+			*reverse (bool): Descending order.
+			->return (Query): Self.
+		'''
+		self._sorts.append((field,reverse))
+		return self
+
+	def explain(self):
+		'''
+		Return a description of the query plan: filters in execution order with their estimated selectivity, projection
+		and sorts.
+		'''
+		lines = []
+		for selectivity,(kind,filters,rule) in self._plan():
+			lines.append('filter '+kind+' '+rule+' '+str(filters)+' (selectivity ~'+str(round(selectivity,3))+')')
+		if self._fields != None:
+			lines.append('select '+str(self._fields))
+		for field,reverse in self._sorts:
+			lines.append('sort '+str(field)+(' reverse' if reverse else ''))
+		return '\n'.join(lines)
+
+	def collect(self):
+		'''
+		[Description]
+			Run query.
+		[Arguments]
+			->return (Grid): Grid with the rows that pass query filters, with the selected fields, sorted.
+		'''
+		grid = self._grid
+		positions = self._positions()
+		for i,(field,reverse) in enumerate(self._sorts):
+			index = grid._getIndex([grid._schema.fields[field] if type(field) == int else field],'sorted')
+			if i == 0 and positions == None and index != None and len(index) == len(grid):
+				positions = index.ordered(reverse)
+			else:
+				column = grid._column(field)
+				positions = sorted(xrange(len(grid)) if positions == None else positions,key=column.__getitem__,reverse=reverse)
+		if self._fields == None:
+			if positions == None:
+				return grid._project(range(len(grid._columns)),grid._schema)
+			return grid._take(positions)
+		fieldIndexes = [grid._fieldIndex(field) for field in self._fields]
+		if positions == None:
+			return grid._project(fieldIndexes,[grid._schema.fields[i] for i in fieldIndexes])
+		return grid._take(positions,fieldIndexes)
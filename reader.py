@@ -0,0 +1,147 @@
+import bz2
+import gzip
+import json
+from itertools import chain, islice
+
+'''
+JSON and NDJSON input used by Grid.fromJson and Grid.iterJson. Records are parsed in chunks of lines (a single json.loads
+call per chunk) and each column is filled in a single pass over the chunk. Fields are the union of record fields in order
+of first appearance, only records that bring new fields are parsed again to find the order of their keys.
+'''
+
+class _Pairs(list):
+	'''
+	JSON object as a list of (key,value) pairs, which keeps the order of its keys.
+	'''
+
+def _value(value):
+	'''
+	Return JSON value as stored in Grids: unicode strings are turned into str (utf-8) and objects into dicts.
+	'''
+	if type(value) == unicode:
+		return value.encode('utf-8')
+	if type(value) == list:
+		return [_value(element) for element in value]
+	if type(value) == _Pairs:
+		return dict([(_value(key),_value(element)) for key,element in value])
+	if type(value) == dict:
+		return dict([(_value(key),_value(element)) for key,element in value.iteritems()])
+	return value
+
+def _column(values):
+	'''
+	Return column values as stored in Grids (see _value).
+	'''
+	if set(map(type,values)) <= set([float,int,long,bool,type(None)]):
+		return values
+	return map(_value,values)
+
+def _open(target):
+	'''
+	Return file to read and whether it must be closed after reading. Paths ending with .gz or .bz2 are decompressed.
+	'''
+	if not isinstance(target,str):
+		return target,False
+	if target.endswith('.gz'):
+		return gzip.open(target,'rb'),True
+	if target.endswith('.bz2'):
+		return bz2.BZ2File(target,'rb'),True
+	return open(target,'rb'),True
+
+def _loads(text):
+	'''
+	Parse JSON text, with objects given as _Pairs.
+	'''
+	return json.loads(text,object_pairs_hook=_Pairs)
+
+def _iterRecords(lines,chunkSize):
+	'''
+	Return generator of chunks of (at most chunkSize) records from NDJSON lines or a JSON list of records. Each chunk is
+	given as its records (objects as dicts) and a function that returns the record at a given position with its keys in
+	order (objects as _Pairs), only called for records that bring new fields.
+	'''
+	lines = (line for line in lines if line.strip() != '')
+	first = list(islice(lines,1))
+	if len(first) == 0:
+		return
+	if first[0].lstrip().startswith('['):
+		records = _loads(''.join(chain(first,lines)))
+		for start in xrange(0,len(records),chunkSize):
+			chunk = records[start:start+chunkSize]
+			yield [dict(record) if type(record) == _Pairs else record for record in chunk],chunk.__getitem__
+	else:
+		lines = chain(first,lines)
+		chunk = list(islice(lines,chunkSize))
+		while len(chunk) > 0:
+			yield json.loads('['+','.join(chunk)+']'),lambda row,chunk=chunk: _loads(chunk[row])
+			chunk = list(islice(lines,chunkSize))
+
+def iterRecords(target,chunkSize=10000,fill_value=None):
+	'''
+	[Description]
+		Read JSON records (objects) in chunks of rows, from NDJSON (one record per line, e.g. a stream) or a JSON list of
+		records (read at once).
+	[Arguments]
+		target (str/file): Path to file or file-like object (any iterable of lines, e.g. sys.stdin or a socket file).
+		*chunkSize (int): Number of records of each chunk.
+		*fill_value (misc): Value of fields missing in a record.
+		->return (generator[tuple]): Fields and columns of each chunk, (list[str],list[list[misc]]). Fields are the union of the
+										fields of all records read so far, so they only grow from one chunk to the next.
+	'''
+	aFile,owned = _open(target)
+	try:
+		fields = []
+		for records,ordered in _iterRecords(aFile,chunkSize):
+			for record in records:
+				if type(record) != dict:
+					raise ValueError('ERROR [reader|iterRecords]: JSON records must be objects, got '+str(_value(record)))
+			# new fields, added in order of first appearance
+			new = set().union(*records).difference(fields)
+			for row,record in enumerate(records):
+				if len(new) == 0:
+					break
+				if not new.isdisjoint(record):
+					for key,value in ordered(row):
+						if key in new:
+							fields.append(key)
+							new.remove(key)
+			columns = [_column([record.get(field,fill_value) for record in records]) for field in fields]
+			yield [_value(field) for field in fields],columns
+	finally:
+		if owned:
+			aFile.close()
+
+def readColumns(target,fill_value=None):
+	'''
+	[Description]
+		Read JSON columns: a single object {"field1":[values],"field2":[values],...} or NDJSON with one or several fields per
+		line (as written by writer.writeJson).
+	[Arguments]
+		target (str/file): Path to file or file-like object.
+		*fill_value (misc): Value used to fill columns shorter than the longest one.
+		->return (tuple): Fields and columns, (list[str],list[list[misc]]).
+	'''
+	aFile,owned = _open(target)
+	try:
+		text = aFile.read()
+	finally:
+		if owned:
+			aFile.close()
+	try:
+		documents = [_loads(text)] if text.strip() != '' else []
+	except ValueError: # NDJSON
+		documents = [_loads(line) for line in text.splitlines() if line.strip() != '']
+	fields = []
+	columns = []
+	for document in documents:
+		if type(document) != _Pairs:
+			raise ValueError('ERROR [reader|readColumns]: JSON columns must be objects, got '+str(document))
+		for key,values in document:
+			if type(values) != list:
+				raise ValueError('ERROR [reader|readColumns]: Values of field '+str(_value(key))+' must be a list')
+			fields.append(_value(key))
+			columns.append(_column(values))
+	nRows = max([len(column) for column in columns]+[0])
+	for column in columns:
+		column.extend([fill_value]*(nRows-len(column)))
+	return fields,columns
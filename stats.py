@@ -0,0 +1,162 @@
+from itertools import izip
+# Utils.
+from indexes import _hashable
+
+'''
+Column statistics cached by Grid (see Grid.stats). Statistics are computed on first use, updated incrementally when rows
+are appended and marked as stale (recomputed on next use) when rows are modified or removed, the same way as indexes.
+'''
+
+# Types of values that are added up in sums and means (bools excluded).
+_NUMBERS = frozenset([int,long,float])
+
+def _isNull(value):
+	'''
+	Check if value is None or NaN.
+	'''
+	return value is None or value != value
+
+class ColumnStats(object):
+	'''
+	Statistics of a single field: number of values, null (None/NaN) values and distinct values, min/max of non null values
+	and sum/mean of numeric columns (None when the column has non null values that are not numbers).
+	Distinct values are kept as a map from value to the position of its first row.
+	'''
+	kind = 'stats'
+
+	def __init__(self,fields):
+		self.fields = tuple(fields)
+		self.invalidate()
+
+	# Private
+
+	def _firstKey(self,value):
+		'''
+		Return distinct values map key of value, or None if it can not be hashed.
+		'''
+		try:
+			hash(value)
+			return value
+		except TypeError: # lists
+			try:
+				return _hashable(value)
+			except TypeError:
+				return None
+
+	def _update(self,value,position):
+		'''
+		Add value of row at given position.
+		'''
+		self.count += 1
+		if _isNull(value):
+			self.nulls += 1
+		else:
+			if self.min is None or value < self.min:
+				self.min = value
+			if self.max is None or value > self.max:
+				self.max = value
+			if self.sum is not None:
+				self.sum = self.sum+value if type(value) in _NUMBERS else None
+		if self._first is not None:
+			key = self._firstKey(value)
+			if key is None:
+				self._first = None
+			elif key not in self._first:
+				self._first[key] = position
+
+	# Public
+
+	def isStale(self):
+		'''
+		Return True if statistics must be recomputed before being used.
+		'''
+		return self.count is None
+
+	def invalidate(self):
+		'''
+		Mark statistics as stale.
+		'''
+		self.count = None
+		self.nulls = None
+		self.min = None
+		self.max = None
+		self.sum = None
+		self._first = None
+
+	def build(self,columns):
+		'''
+		[Description]
+			Compute statistics from scratch.
+		[Arguments]
+			columns (list[list[misc]]): Grid column of the field (as a single element list).
+		'''
+		column = columns[0]
+		types = set(map(type,column))
+		values = column
+		self.count = len(column)
+		self.nulls = column.count(None)
+		if float in types:
+			nans = len([value for value in column if value != value])
+			self.nulls += nans
+		if self.nulls > 0:
+			values = [value for value in column if not _isNull(value)]
+		self.min = min(values) if len(values) > 0 else None
+		self.max = max(values) if len(values) > 0 else None
+		self.sum = sum(values) if types-set([type(None)]) <= _NUMBERS else None
+		# first position of each value, later positions are overwritten by earlier ones
+		try:
+			self._first = dict(izip(reversed(column),xrange(len(column)-1,-1,-1)))
+		except TypeError: # lists
+			try:
+				self._first = dict(izip([_hashable(value) for value in reversed(column)],xrange(len(column)-1,-1,-1)))
+			except TypeError:
+				self._first = None
+
+	def extend(self,columns,start):
+		'''
+		[Description]
+			Add rows appended to the grid to statistics.
+		[Arguments]
+			columns (list[list[misc]]): Grid column of the field (as a single element list).
+			start (int): Position of first appended row.
+		'''
+		if self.count is not None:
+			column = columns[0]
+			for position in xrange(start,len(column)):
+				self._update(column[position],position)
+
+	def add(self,columns,position):
+		'''
+		Add row at given position (see extend for arguments).
+		'''
+		if self.count is not None:
+			self._update(columns[0][position],position)
+
+	def remove(self,columns,position):
+		'''
+		Remove row at given position. Statistics such as min/max can not be updated, so they are marked as stale.
+		'''
+		self.invalidate()
+
+	def distinctPositions(self):
+		'''
+		Return the position of the first row of each distinct value in ascending order, or None if values can not be hashed.
+		'''
+		if self._first is None:
+			return None
+		return sorted(self._first.itervalues())
+
+	def asDict(self):
+		'''
+		Return statistics as a dict: count, nulls, distinct, min, max, sum and mean.
+		'''
+		numbers = self.count-self.nulls
+		return {
+			'count':self.count,
+			'nulls':self.nulls,
+			'distinct':None if self._first is None else len(self._first),
+			'min':self.min,
+			'max':self.max,
+			'sum':self.sum,
+			'mean':None if self.sum is None or numbers == 0 else float(self.sum)/numbers,
+		}
@@ -0,0 +1,379 @@
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+from collections import OrderedDict
+from StringIO import StringIO
+try:
+	import numpy as np
+	_HAS_NUMPY = True
+except ImportError:
+	_HAS_NUMPY = False
+# Utils.
+from Grid import Grid
+from lazy import LazyGrid
+
+'''
+Grid tests, run from the package folder with:
+	python -m unittest test_grid
+'''
+
+class DropTest(unittest.TestCase):
+
+	def setUp(self):
+		self.grid = Grid([[1],[2],[3],[4]],['v'])
+
+	def testMask(self):
+		self.assertEqual(self.grid.drop([False,False,True,True]),2)
+		self.assertEqual(self.grid['v'],[1,2])
+
+	def testIndices(self):
+		self.grid.retain([0,-1])
+		self.assertEqual(self.grid['v'],[1,4])
+
+	@unittest.skipIf(not _HAS_NUMPY,'NumPy not available')
+	def testNumpyBoolList(self):
+		self.grid.drop(list(np.array(self.grid['v']) > 2))
+		self.assertEqual(self.grid['v'],[1,2])
+
+	@unittest.skipIf(not _HAS_NUMPY,'NumPy not available')
+	def testNumpyArrays(self):
+		self.grid.drop(np.array(self.grid['v']) > 2)
+		self.assertEqual(self.grid['v'],[1,2])
+		self.grid.retain(np.array([1]))
+		self.assertEqual(self.grid['v'],[2])
+
+	def testInvalidRows(self):
+		self.assertRaises(ValueError,self.grid.drop,[1.0,2.0])
+		self.assertRaises(ValueError,self.grid.drop,[True,1,False,0])
+		self.assertEqual(self.grid['v'],[1,2,3,4])
+
+class RemoveColumnTest(unittest.TestCase):
+
+	def setUp(self):
+		self.grid = Grid([[1,2,3]],['a','b','c'])
+
+	def testNegativeIndex(self):
+		self.grid.createIndex('c')
+		self.grid.createIndex('a')
+		self.grid.drop(columns=-1)
+		self.assertEqual(self.grid.header,['a','b'])
+		self.assertEqual(self.grid.asList(),[[1,2]])
+		self.assertEqual(self.grid._indexes.keys(),[('hash',('a',))])
+
+	def testNamesAndIndices(self):
+		self.grid.removeColumn(['a',-2])
+		self.assertEqual(self.grid.header,['c'])
+
+	def testIndexOutOfRange(self):
+		self.assertRaises(IndexError,self.grid.removeColumn,3)
+		self.assertRaises(IndexError,self.grid.removeColumn,-4)
+		self.assertEqual(self.grid.header,['a','b','c'])
+
+class FilterTest(unittest.TestCase):
+
+	def testNaNValuesWithoutWarnings(self):
+		grid = Grid([[3.0],[float('nan')],[1.0],[2.0],[0.5]],['v'])
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always')
+			self.assertEqual(grid[{'v':'<2.5'}]['v'],[1.0,2.0,0.5])
+			self.assertEqual(grid[{'v':'[1,3)'}]['v'],[1.0,2.0])
+			self.assertEqual(grid[{'v':'in (1.0,3.0)'}]['v'],[3.0,1.0])
+		self.assertEqual(caught,[])
+
+class GroupByTest(unittest.TestCase):
+
+	def testNullsAreSkipped(self):
+		grid = Grid([[1,2.0],[1,None],[2,3.0],[3,None]],['k','v'])
+		result = grid.groupBy('k').agg([('v',['sum','mean','min','max','count'])])
+		self.assertEqual(result['v_sum'],[2.0,3.0,None])
+		self.assertEqual(result['v_mean'],[2.0,3.0,None])
+		self.assertEqual(result['v_min'],[2.0,3.0,None])
+		self.assertEqual(result['v_max'],[2.0,3.0,None])
+		self.assertEqual(result['v_count'],[2,1,1])
+
+	def testNaNsAreSkipped(self):
+		nan = float('nan')
+		grid = Grid([[1,2.0],[1,nan],[1,4.0],[2,nan]],['k','v'])
+		result = grid.groupBy('k').agg([('v',['sum','mean','min','max'])])
+		self.assertEqual(result['v_sum'],[6.0,None])
+		self.assertEqual(result['v_mean'],[3.0,None])
+		self.assertEqual(result['v_min'],[2.0,None])
+		self.assertEqual(result['v_max'],[4.0,None])
+
+	def testAggregationOrder(self):
+		grid = Grid([[1,2.0,3.0,4.0]],['k','a','b','c'])
+		self.assertEqual(grid.groupBy('k').agg([('c','sum'),('a','sum'),('b','sum')]).header,['k','c','a','b'])
+		self.assertEqual(grid.groupBy('k').agg(OrderedDict([('b','sum'),('c','sum'),('a','sum')])).header,['k','b','c','a'])
+		self.assertEqual(grid.groupBy('k').agg({'c':'sum','b':'sum','a':'sum'}).header,['k','a','b','c'])
+
+class ConcatTest(unittest.TestCase):
+
+	def testNoHeaderMessagesForFirstSource(self):
+		stdout,sys.stdout = sys.stdout,StringIO()
+		try:
+			grid = Grid.concat([Grid([[1,2]],['a','b']),Grid([[3,4]],['a','b'])])
+			output = sys.stdout.getvalue()
+		finally:
+			sys.stdout = stdout
+		self.assertEqual(output,'')
+		self.assertEqual(grid.header,['a','b'])
+		self.assertEqual(grid['a'],[1,3])
+
+def _sampleGrid(nRows):
+	'''
+	Return grid with int, float, bool, str, nullable float and list columns.
+	'''
+	return Grid([[i,i*0.25,i%3 == 0,'s'+str(i%7),None if i%5 == 0 else i/3.0,[i%2,'x']] for i in xrange(nRows)],
+				['i','f','b','s','n','l'])
+
+class _FilesTest(unittest.TestCase):
+	'''
+	Tests that write files in a temporary folder.
+	'''
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def path(self,name):
+		return os.path.join(self.folder,name)
+
+	def assertSameGrid(self,grid,other):
+		'''
+		Check that grids have the same header, values and value types.
+		'''
+		self.assertEqual(grid.header,other.header)
+		self.assertEqual(grid.asList(),other.asList())
+		self.assertEqual([map(type,column) for column in grid._columns],[map(type,column) for column in other._columns])
+
+class BinaryTest(_FilesTest):
+
+	def testRoundTrip(self):
+		grid = _sampleGrid(1000)
+		grid.saveBinary(self.path('grid.bin'))
+		for mmap in [True,False]:
+			loaded = Grid.loadBinary(self.path('grid.bin'),mmap=mmap)
+			self.assertEqual(loaded.header,grid.header)
+			self.assertEqual(loaded.asList(),grid.asList())
+			self.assertEqual(map(type,loaded[1].values()),map(type,grid[1].values()))
+
+	def testSomeColumns(self):
+		grid = _sampleGrid(100)
+		grid.saveBinary(self.path('grid.bin'),['n','i'])
+		self.assertEqual(Grid.loadBinary(self.path('grid.bin')).asList(),grid.select(['n','i']).asList())
+		loaded = Grid.loadBinary(self.path('grid.bin'),['i'])
+		self.assertEqual((loaded.header,loaded['i']),(['i'],grid['i']))
+
+	def testEmptyGrid(self):
+		Grid([],['a','b']).saveBinary(self.path('grid.bin'))
+		loaded = Grid.loadBinary(self.path('grid.bin'))
+		self.assertEqual((loaded.header,len(loaded)),(['a','b'],0))
+
+class ParallelParseTest(_FilesTest):
+
+	def testSameAsSerial(self):
+		_sampleGrid(20000).save(self.path('grid.csv'))
+		for workers in [2,3]:
+			self.assertSameGrid(Grid(self.path('grid.csv'),workers=workers),Grid(self.path('grid.csv')))
+		self.assertSameGrid(Grid(self.path('grid.csv'),False,workers=2),Grid(self.path('grid.csv'),False))
+
+	def testLastLineWithoutLineBreak(self):
+		with open(self.path('grid.csv'),'w') as aFile:
+			aFile.write('a,b\n'+'\n'.join(['%d,%f' % (i,i/7.0) for i in xrange(5000)]))
+		self.assertSameGrid(Grid(self.path('grid.csv'),workers=4),Grid(self.path('grid.csv')))
+
+	def testSmallFile(self):
+		with open(self.path('grid.csv'),'w') as aFile:
+			aFile.write('a,b\n1,2\n')
+		self.assertSameGrid(Grid(self.path('grid.csv'),workers=4),Grid(self.path('grid.csv')))
+
+class ToJsonTest(_FilesTest):
+
+	def setUp(self):
+		_FilesTest.setUp(self)
+		self.grid = _sampleGrid(250)
+		self.grid + [1,float('nan'),True,'\xc3\xa9 "q"',float('inf'),[]]
+
+	def records(self):
+		return [OrderedDict(zip(self.grid.header,row)) for row in self.grid.asList()]
+
+	def loads(self,text):
+		return json.loads(text,object_pairs_hook=OrderedDict)
+
+	def assertSameJson(self,value,expected):
+		# NaN is not equal to itself, so values are compared as json.dumps writes them
+		self.assertEqual(json.dumps(value),json.dumps(expected))
+
+	def write(self,*args,**kwargs):
+		aFile = StringIO()
+		self.grid.toJson(aFile,*args,chunkSize=100,**kwargs)
+		return aFile.getvalue()
+
+	def testRecords(self):
+		self.assertSameJson([self.loads(line) for line in self.write().splitlines()],self.records())
+		self.assertSameJson(self.loads(self.write(ndjson=False)),self.records())
+
+	def testColumns(self):
+		columns = OrderedDict([(field,self.grid[field]) for field in self.grid.header])
+		self.assertSameJson(self.loads(self.write('columns',ndjson=False)),columns)
+		lines = [self.loads(line) for line in self.write('columns').splitlines()]
+		self.assertSameJson(lines,[OrderedDict([item]) for item in columns.items()])
+
+	def testOptions(self):
+		records = [self.loads(line) for line in self.write(columns=['s','f'],roundFloats=0).splitlines()]
+		self.assertSameJson(records,[OrderedDict([('s',row['s']),('f',round(row['f']))]) for row in self.records()])
+		self.grid.toJson(self.path('grid.json.gz'))
+		self.assertEqual(gzip.open(self.path('grid.json.gz')).read(),self.write())
+
+	def testEmptyGrid(self):
+		self.grid = Grid([],['a'])
+		self.assertEqual(self.write(),'')
+		self.assertEqual(self.loads(self.write(ndjson=False)),[])
+		self.assertEqual(self.loads(self.write('columns',ndjson=False)),{'a':[]})
+
+class FromJsonTest(_FilesTest):
+
+	def testRoundTrip(self):
+		grid = _sampleGrid(2500)
+		for orient in ['records','columns']:
+			for ndjson in [True,False]:
+				grid.toJson(self.path('grid.json'),orient,ndjson)
+				self.assertSameGrid(Grid.fromJson(self.path('grid.json'),orient,chunkSize=1000),grid)
+		grid.toJson(self.path('grid.json.gz'))
+		self.assertSameGrid(Grid.fromJson(self.path('grid.json.gz')),grid)
+
+	def testMissingFields(self):
+		aFile = StringIO('{"a":1,"b":"x"}\n\n{"c":[1],"a":2}\n{"b":"y","d":{"k":"v"}}\n')
+		grid = Grid.fromJson(aFile,fill_value=0,chunkSize=2)
+		self.assertEqual(grid.header,['a','b','c','d'])
+		self.assertEqual(grid.asList(),[[1,'x',0,0],[2,0,[1],0],[0,'y',0,{'k':'v'}]])
+		self.assertEqual(type(grid[0]['b']),str)
+
+	def testIterJson(self):
+		aFile = StringIO()
+		_sampleGrid(25).toJson(aFile)
+		aFile.write('{"i":25,"z":true}\n')
+		aFile.seek(0)
+		chunks = list(Grid.iterJson(aFile,10))
+		self.assertEqual(map(len,chunks),[10,10,6])
+		self.assertEqual(chunks[0].header,['i','f','b','s','n','l'])
+		self.assertEqual(chunks[2].header,['i','f','b','s','n','l','z'])
+		self.assertEqual(chunks[2]['z'],[None]*5+[True])
+
+	def testInvalidRecords(self):
+		self.assertRaises(ValueError,Grid.fromJson,StringIO('{"a":1}\n[1]\n'))
+		self.assertRaises(ValueError,Grid.fromJson,StringIO('{"a":1}'),'rows')
+
+def _nestedLoopJoin(grid,other,on,how):
+	'''
+	Return rows of grid.join(other,on,how), joined with nested loops.
+	'''
+	keys = [grid.header.index(field) for field in on]
+	otherKeys = [other.header.index(field) for field in on]
+	otherFields = [i for i,field in enumerate(other.header) if field not in on]
+	rows = []
+	matched = set()
+	for row in grid.asList():
+		found = False
+		for j,otherRow in enumerate(other.asList()):
+			if [row[i] for i in keys] == [otherRow[i] for i in otherKeys]:
+				rows.append(row+[otherRow[i] for i in otherFields])
+				matched.add(j)
+				found = True
+		if not found and how != 'inner':
+			rows.append(row+[None]*len(otherFields))
+	if how == 'outer':
+		for j,otherRow in enumerate(other.asList()):
+			if j not in matched:
+				row = [None]*len(grid.header)
+				for i,k in zip(keys,otherKeys):
+					row[i] = otherRow[k]
+				rows.append(row+[otherRow[i] for i in otherFields])
+	return rows
+
+class JoinTest(unittest.TestCase):
+
+	def setUp(self):
+		self.small = Grid([[1,'a',10.0],[2,'b',20.0],[2,'b',21.0],[5,'e',50.0]],['k','s','x'])
+		self.large = Grid([[i%4,'abcd'[i%4],i] for i in xrange(10)],['k','s','y'])
+
+	def testBothBuildSides(self):
+		for how in ['inner','left','outer']:
+			for on in [['k'],['k','s']]:
+				# hash table built on the smaller grid (other grid first, this grid then)
+				for grid,other in [(self.large,self.small),(self.small,self.large)]:
+					joined = grid.join(other,on,how)
+					self.assertEqual(joined.asList(),_nestedLoopJoin(grid,other,on,how),(how,on,len(grid)))
+					otherFields = [field+'_other' if field in grid.header else field for field in other.header if field not in on]
+					self.assertEqual(joined.header,grid.header+otherFields)
+
+	def testStreamedChunks(self):
+		for how in ['inner','left','outer']:
+			chunks = [self.large[0:4],self.large[4:10]]
+			self.assertEqual(self.small.join(iter(chunks),'k',how).asList(),self.small.join(self.large,'k',how).asList())
+
+	def testSuffix(self):
+		joined = self.small.join(Grid([[1,'z']],['k','s']),'k')
+		self.assertEqual(joined.header,['k','s','x','s_other'])
+		self.assertEqual(joined.asList(),[[1,'a',10.0,'z']])
+
+class LazyGridTest(unittest.TestCase):
+
+	def setUp(self):
+		aFile,self.path = tempfile.mkstemp('.csv')
+		os.write(aFile,'a,b\n1,2\n3,4\n')
+		os.close(aFile)
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def testSameInitialStateAsGrid(self):
+		grid = Grid(self.path)
+		lazyGrid = LazyGrid(self.path)
+		for attribute in ['_sharedColumns','_indexes','defaultFilterRule','zeroCopy','workers']:
+			self.assertEqual(getattr(lazyGrid,attribute),getattr(grid,attribute))
+		self.assertEqual(lazyGrid[1]['a'],3)
+
+	def testEmptyHeaderFieldsAreRemoved(self):
+		with open(self.path,'w') as aFile:
+			aFile.write('a,,b\n1,2,3\n4,5,6\n')
+		grid = Grid(self.path)
+		self.assertEqual(LazyGrid(self.path).header,grid.header)
+		self.assertEqual(LazyGrid(self.path)[1].values(),grid[1].values())
+		self.assertEqual(LazyGrid(self.path)[0:2].asList(),grid.asList())
+		self.assertEqual(LazyGrid(self.path).asList(),grid.asList())
+
+class SortTest(unittest.TestCase):
+
+	def testMultipleFields(self):
+		grid = Grid([[1,'b'],[2,'a'],[1,'a']],['n','s'])
+		grid.sort(['n','s'],[True,False])
+		self.assertEqual([row.values() for row in grid],[[2,'a'],[1,'a'],[1,'b']])
+
+	def testReverseLengthMustMatchFields(self):
+		grid = Grid([[1,'b'],[2,'a'],[1,'a']],['n','s'])
+		self.assertRaises(ValueError,grid.sort,['n','s'],[True])
+		self.assertRaises(ValueError,grid.sort,'n',[True,False])
+		self.assertEqual(grid['n'],[1,2,1])
+		self.assertEqual([key for key in grid._indexes if key[0] == 'order'],[])
+
+	def testNaNValues(self):
+		grid = Grid([[3.0],[float('nan')],[1.0],[2.0],[0.5]],['v'])
+		grid.sort('v')
+		self.assertEqual(sorted(grid[{'v':'<2.5'}]['v']),[0.5,1.0,2.0])
+		self.assertEqual(grid[{'v':'[1,3]'}]['v'],[value for value in grid['v'] if 1 <= value <= 3])
+		self.assertEqual(grid.bounds('v')[0] <= grid.bounds('v')[1],True)
+		self.assertEqual(grid.topK('v',2)['v'],[3.0,2.0])
+		self.assertEqual(grid.nsmallest('v',2)['v'],[0.5,1.0])
+		grid.sort('v',True)
+		self.assertEqual(sorted(grid[{'v':'>=1'}]['v']),[1.0,2.0,3.0])
+
+if __name__ == '__main__':
+	unittest.main()
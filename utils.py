@@ -1,3 +1,25 @@
+from copy import deepcopy
+from itertools import islice
+
+# Types whose values can be shared between Grids, GridRows and callers without copying them.
+_IMMUTABLE = frozenset([type(None),bool,int,long,float,complex,str,unicode])
+
+def _copyValue(value):
+	'''
+	Return value itself if it is immutable, otherwise return a deep copy of it.
+	'''
+	if type(value) in _IMMUTABLE:
+		return value
+	return deepcopy(value)
+
+def _copyList(values):
+	'''
+	Return a new list with given values, where only mutable values (e.g. lists) are deep copied.
+	'''
+	if set(map(type,values)) <= _IMMUTABLE:
+		return list(values)
+	return [_copyValue(value) for value in values]
+
 def dynamicTyped(s,forceFloat=True):
 	'''
 	[Description]
@@ -111,7 +133,228 @@ def dynamicTyped(s,forceFloat=True):
 	else:
 		return s
 
-def parse(contents,dynamicType=True,noneEmpty=True,sep=',',listSep=';'):
+# Characters that float strings accepted by dynamicTyped end with.
+_FLOAT_END = frozenset('0123456789.')
+_BOOLS = {'true':True,'false':False}
+
+def _fallbackConverter(dynamicType=True,noneEmpty=True,listSep=';'):
+	'''
+	[Description]
+		Return generic element converter, which handles empty values, lists and any type (through dynamicTyped).
+		All other converters fall back to it for elements they can not convert.
+	[Arguments]
+		*dynamicType (bool): Convert elements to python type automatically.
+		*noneEmpty (bool): Set empty values to None.
+		*listSep (str/None): A separator to identify elements that belong to a list.
+		->return (function): Converter f(str) = value.
+	'''
+	def convert(element):
+		# set empty values to None
+		if element == '' and noneEmpty == True:
+			return None
+		# parse lists
+		if listSep != None and listSep in element:
+			if element[0] == '[' and element[-1] == ']':
+				element = element[1:-1]
+			element = element.split(listSep)
+		# set values type automatically
+		if dynamicType == True:
+			return dynamicTyped(element)
+		return element
+	return convert
+
+def _inferredConverter(dtype,fallback,listSep=';'):
+	'''
+	[Description]
+		Return converter specialised for elements of inferred type dtype.
+		Converters only accept elements for which they give the same result as dynamicTyped, the rest are given to fallback.
+	[Arguments]
+		dtype (type): Inferred column type (float, bool, str or NoneType).
+		fallback (function): Generic converter (see _fallbackConverter).
+		*listSep (str/None): A separator to identify elements that belong to a list.
+		->return (function): Converter f(str) = value.
+	'''
+	if dtype == float and (listSep == None or not set(listSep) & set('0123456789.+-eE')):
+		def convert(element):
+			if element[-1:] in _FLOAT_END:
+				try:
+					return float(element)
+				except ValueError:
+					pass
+			return fallback(element)
+	elif dtype == bool:
+		def convert(element):
+			value = _BOOLS.get(element.lower())
+			if value == None:
+				return fallback(element)
+			return value
+	elif dtype == str:
+		def convert(element):
+			if type(element) == str and element[:1].isalpha() and element != 'None' and element.lower() not in _BOOLS \
+				and ',' not in element and (listSep == None or listSep not in element):
+				return element
+			return fallback(element)
+	elif dtype == type(None):
+		def convert(element):
+			if element == 'None':
+				return None
+			return fallback(element)
+	else:
+		convert = fallback
+	return convert
+
+def _explicitConverter(dtype,fallback,listSep=';'):
+	'''
+	[Description]
+		Return converter that casts elements to given type. Elements that can not be cast (e.g. header or empty values)
+		are given to fallback.
+	[Arguments]
+		dtype (type): Column type (float, int, bool or str).
+		fallback (function): Generic converter (see _fallbackConverter).
+		*listSep (str/None): A separator to identify elements that belong to a list.
+		->return (function): Converter f(str) = value.
+	'''
+	if dtype in (float,int):
+		def convert(element):
+			try:
+				return dtype(element)
+			except ValueError:
+				return fallback(element)
+	elif dtype == str:
+		def convert(element):
+			if element == '' or (listSep != None and listSep in element):
+				return fallback(element)
+			return element
+	elif dtype == bool:
+		convert = _inferredConverter(bool,fallback,listSep)
+	else:
+		raise TypeError('ERROR [utils|_explicitConverter]: Type '+str(dtype)+' not supported.')
+	return convert
+
+def inferTypes(rows,dynamicType=True,noneEmpty=True,listSep=';'):
+	'''
+	[Description]
+		Infer the type of each column from a sample of rows, as the most common type given by dynamicTyped (empty values excluded).
+	[Arguments]
+		rows (list[list[str]]): Sample rows, with their elements as strings.
+		*dynamicType (bool): Convert elements to python type automatically.
+		*noneEmpty (bool): Set empty values to None.
+		*listSep (str/None): A separator to identify elements that belong to a list.
+		->return (list[type/None]): Type of each column (None if it can not be inferred).
+	'''
+	fallback = _fallbackConverter(dynamicType,noneEmpty,listSep)
+	if len(rows) == 0:
+		return []
+	dtypes = []
+	for i in range(len(rows[0])):
+		counts = {}
+		for row in rows:
+			if i < len(row) and row[i] != '':
+				dtype = type(fallback(row[i]))
+				counts[dtype] = counts.get(dtype,0)+1
+		if len(counts) > 0:
+			dtypes.append(max(counts,key=counts.get))
+		else:
+			dtypes.append(None)
+	return dtypes
+
+def compileConverters(rows,dtypes=None,dynamicType=True,noneEmpty=True,listSep=';'):
+	'''
+	[Description]
+		Return one converter per column, specialised for its type.
+		Column types are given by dtypes or, when dynamicType is set, inferred from given sample rows.
+	[Arguments]
+		rows (list[list[str]]): Sample rows, with their elements as strings. First row is used to look up field names.
+		*dtypes (None/list[type]/dict[str/int:type]): Column types (float, int, bool or str) by column position, or dict
+							of {field name/column index: type}. Field names are looked up in the first sample row (header).
+		*dynamicType (bool): Convert elements to python type automatically.
+		*noneEmpty (bool): Set empty values to None.
+		*listSep (str/None): A separator to identify elements that belong to a list.
+		->return (list[function]): Converters f(str) = value.
+	'''
+	fallback = _fallbackConverter(dynamicType,noneEmpty,listSep)
+	nColumns = len(rows[0]) if len(rows) > 0 else 0
+	# explicit types
+	explicit = {}
+	if isinstance(dtypes,dict):
+		for key in dtypes:
+			if type(key) == str:
+				explicit[[element.strip() for element in rows[0]].index(key)] = dtypes[key]
+			else:
+				explicit[key] = dtypes[key]
+	elif dtypes != None:
+		explicit = dict(enumerate(dtypes))
+	# inferred types
+	if dynamicType == True:
+		inferred = inferTypes(rows,dynamicType,noneEmpty,listSep)
+	else:
+		inferred = [None]*nColumns
+	converters = []
+	for i in range(max([nColumns]+[i+1 for i in explicit])):
+		if i in explicit:
+			converters.append(_explicitConverter(explicit[i],fallback,listSep))
+		elif i < nColumns:
+			converters.append(_inferredConverter(inferred[i],fallback,listSep))
+		else:
+			converters.append(fallback)
+	return converters
+
+def _convertRows(rows,converters,fallback):
+	'''
+	Convert a block of rows column by column with their converters. Rows whose length differs from the number of
+	converters are converted one by one.
+	'''
+	if len(rows) > 0 and set(map(len,rows)) == set([len(converters)]):
+		columns = [map(convert,column) for convert,column in zip(converters,zip(*rows))]
+		return map(list,zip(*columns))
+	return [[(converters[i] if i < len(converters) else fallback)(element) for i,element in enumerate(row)] for row in rows]
+
+def iterParse(lines,dynamicType=True,noneEmpty=True,sep=',',listSep=';',dtypes=None,sampleSize=100,blockSize=1000):
+	'''
+	[Description]
+		Parse the raw contents of a text file line by line.
+		Column types are inferred from the first sampleSize rows (or given by dtypes) and each column is then converted with a
+		converter specialised for its type, falling back to dynamicTyped only for elements that do not match. Lines are read
+		and converted in blocks of blockSize rows, so only one block is held in memory at a time. Empty lines are skipped.
+	[Arguments]
+		lines (iterable[str]): Lines of text (e.g. an open file), each one corresponding to a row.
+		*dynamicType (bool): Convert elements to python type automatically.
+		*noneEmpty (bool): Set empty values to None.
+		*sep (str): Element separator.
+		*listSep (str/None): A separator to identify elements that belong to a list.
+		*dtypes (None/list[type]/dict[str/int:type]): Column types, see compileConverters.
+		*sampleSize (int): Number of rows used to infer column types.
+		*blockSize (int): Number of rows converted at once.
+		->return (generator[list[misc]]): Parsed rows.
+	'''
+	rows = (line.split(sep) for line in (line.strip() for line in lines) if line != '')
+	fallback = _fallbackConverter(dynamicType,noneEmpty,listSep)
+	block = list(islice(rows,sampleSize))
+	converters = compileConverters(block,dtypes,dynamicType,noneEmpty,listSep)
+	while len(block) > 0:
+		for row in _convertRows(block,converters,fallback):
+			yield row
+		block = list(islice(rows,blockSize))
+
+def lineParser(sample,dynamicType=True,noneEmpty=True,sep=',',listSep=';',dtypes=None,sampleSize=100):
+	'''
+	[Description]
+		Return a function that parses any given lines of a text file (e.g. for random access to file rows), giving the same
+		rows as iterParse. Column converters are compiled once from the sample lines.
+	[Arguments]
+		sample (list[str]): First lines of the file (header included), column types are inferred from the first sampleSize rows.
+		*dynamicType, noneEmpty, sep, listSep, dtypes, sampleSize: See iterParse.
+		->return (function): Parser f(list[str]) = list[list[misc]], empty lines are skipped.
+	'''
+	fallback = _fallbackConverter(dynamicType,noneEmpty,listSep)
+	def split(lines):
+		return [line.split(sep) for line in (line.strip() for line in lines) if line != '']
+	converters = compileConverters(split(sample)[:sampleSize],dtypes,dynamicType,noneEmpty,listSep)
+	def parseLines(lines):
+		return _convertRows(split(lines),converters,fallback)
+	return parseLines
+
+def parse(contents,dynamicType=True,noneEmpty=True,sep=',',listSep=';',dtypes=None):
 	'''
 	[Description]
 		Parse the raw contents of a text file.
@@ -121,37 +364,6 @@ def parse(contents,dynamicType=True,noneEmpty=True,sep=',',listSep=';'):
 		*noneEmpty (bool): Set empty values to None.
 		*sep (str): Element separator.
 		*listSep (str/None): A separator to identify elements that belong to a list.
+		*dtypes (None/list[type]/dict[str/int:type]): Column types, see compileConverters.
 	'''
-	contents = [row.strip().split(sep) for row in contents]
-	# set empty values to None
-	if noneEmpty == True:
-		filteredContents = []
-		for row in contents:
-			newRow = []
-			for element in row:
-				if element == '':
-					newRow.append(None)
-				else: newRow.append(element)
-			filteredContents.append(newRow)
-		contents = filteredContents
-	# parse lists
-	if listSep != None:
-		filteredContents = []
-		for row in contents:
-			newRow = []
-			for element in row:
-				if element != None:
-					if len(element.split(listSep)) > 1:
-						if element[0] == '[' and element[-1] == ']':
-							element = element[1:-1]
-						newRow.append(element.split(listSep))
-					else:
-						newRow.append(element)
-				else:
-					newRow.append(element)
-			filteredContents.append(newRow)
-		contents = filteredContents
-	# set values type automatically
-	if dynamicType == True:
-		contents = [dynamicTyped(row) for row in contents]
-	return contents
\ No newline at end of file
+	return list(iterParse(contents,dynamicType,noneEmpty,sep,listSep,dtypes))
@@ -0,0 +1,163 @@
+import operator
+from functools import partial
+from itertools import compress
+try:
+	import numpy as np
+	_HAS_NUMPY = True
+except ImportError:
+	_HAS_NUMPY = False
+# Utils.
+from expressions import parseExpression, compileExpression
+
+'''
+Column-wise (vectorized) operations used by Grid filters and computed columns.
+Numeric columns are processed as NumPy arrays when NumPy is available, otherwise (and for non numeric columns) plain python
+is used. Row masks are lists of bools or NumPy bool arrays, mask functions accept both.
+'''
+
+# Types of values that are processed as numpy numbers (bools excluded, they are kept as python objects).
+_NUMBERS = frozenset([int,float])
+# Types of mask elements.
+_BOOLS = (bool,np.bool_) if _HAS_NUMPY else (bool,)
+
+def numericArray(column):
+	'''
+	[Description]
+		Return column as a numpy array if NumPy is available and all column values are numbers.
+	[Arguments]
+		column (list[misc]): Column values.
+		->return (numpy.ndarray/None): Numeric array, or None if column can not be vectorized.
+	'''
+	if _HAS_NUMPY and len(column) > 0 and set(map(type,column)) <= _NUMBERS:
+		return np.array(column)
+	return None
+
+def _areNumbers(values):
+	'''
+	Check if all given values are numbers.
+	'''
+	return set(map(type,values)) <= _NUMBERS
+
+def maskOr(mask,other):
+	'''
+	Combine masks so that rows are kept if they are kept by any of them.
+	'''
+	if _HAS_NUMPY and (isinstance(mask,np.ndarray) or isinstance(other,np.ndarray)):
+		return np.logical_or(mask,other)
+	return map(operator.or_,mask,other)
+
+def maskAnd(mask,other):
+	'''
+	Combine masks so that rows are kept if they are kept by all of them.
+	'''
+	if _HAS_NUMPY and (isinstance(mask,np.ndarray) or isinstance(other,np.ndarray)):
+		return np.logical_and(mask,other)
+	return map(operator.and_,mask,other)
+
+def maskIndices(mask):
+	'''
+	Return indices of rows kept by mask.
+	'''
+	if _HAS_NUMPY and isinstance(mask,np.ndarray):
+		return np.flatnonzero(mask).tolist()
+	return list(compress(xrange(len(mask)),mask))
+
+def valueMask(column,values):
+	'''
+	[Description]
+		Return mask of column values equal to any of the given values.
+	[Arguments]
+		column (list[misc]): Column values.
+		values (list[misc]): Values to keep.
+		->return (list[bool]/numpy.ndarray): Mask.
+	'''
+	if _areNumbers(values):
+		array = numericArray(column)
+		if array is not None:
+			with np.errstate(invalid='ignore'):
+				return np.in1d(array,values)
+	mask = [False]*len(column)
+	for value in values:
+		mask = map(operator.or_,mask,map(partial(operator.eq,value),column))
+	return mask
+
+def expressionMask(column,expression):
+	'''
+	[Description]
+		Return mask of column values that satisfy an expression (see expressions module).
+	[Arguments]
+		column (list[misc]): Column values.
+		expression (str): Expression, e.g. '<5'.
+		->return (list[bool]/numpy.ndarray): Mask.
+	'''
+	parsed = parseExpression(expression)
+	if parsed[0] == 'compare':
+		operands = [parsed[2]]
+	elif parsed[0] == 'range':
+		operands = [parsed[2],parsed[4]]
+	else:
+		operands = parsed[2]
+	if _areNumbers(operands):
+		array = numericArray(column)
+		if array is not None:
+			with np.errstate(invalid='ignore'): # NaN values are compared as in python, without warnings
+				if parsed[0] == 'compare':
+					return parsed[1](parsed[2],array)
+				elif parsed[0] == 'range':
+					return np.logical_and(parsed[1](parsed[2],array),parsed[3](parsed[4],array))
+				else:
+					return np.in1d(array,parsed[2],invert=parsed[1])
+	return map(compileExpression(parsed),column)
+
+class _Columns(object):
+	'''
+	Dict-like access to Grid columns as numpy arrays (numeric columns) or numpy object arrays (rest of columns).
+	'''
+	def __init__(self,grid):
+		self._grid = grid
+
+	def __getitem__(self,field):
+		column = self._grid._column(field)
+		array = numericArray(column)
+		if array is None:
+			array = np.empty(len(column),dtype=object)
+			for i,value in enumerate(column):
+				array[i] = value
+		return array
+
+class Vectorized(object):
+	'''
+	Function of Grid columns that is evaluated for all rows at once, e.g.
+		grid['F'] = Vectorized(lambda c: (c['Total_Fx']**2+c['Total_Fy']**2)**0.5)
+	When NumPy is available the function is called once with whole columns (c[field] is a numpy array), otherwise it is
+	called with each GridRow (c[field] is a single value). Hence, function must only use operations that are valid both
+	for numbers and numpy arrays (arithmetic, comparisons, numpy functions...).
+	Vectorized functions can be used to create columns (Grid.__setitem__) and as filtering functions (Grid._filter_function).
+	'''
+	def __init__(self,func):
+		self.func = func
+
+	def __call__(self,row,*args):
+		'''
+		Evaluate function for a single GridRow.
+		'''
+		return self.func(row,*args)
+
+	def evaluate(self,grid,*args):
+		'''
+		[Description]
+			Evaluate function for all grid rows.
+		[Arguments]
+			grid (Grid): Grid to evaluate function on.
+			*args (misc): Additional arguments passed to function.
+			->return (list[misc]): Function value for each grid row.
+		'''
+		if _HAS_NUMPY and len(grid) > 0:
+			try:
+				values = self.func(_Columns(grid),*args)
+			except Exception:
+				# not vectorizable (e.g. math functions or conditionals on arrays), evaluate row by row.
+				values = None
+			if isinstance(values,np.ndarray) and values.shape == (len(grid),):
+				return values.tolist()
+		return [self.func(row,*args) for row in grid]
@@ -0,0 +1,209 @@
+import bz2
+import json
+import zlib
+from itertools import izip
+from json.encoder import encode_basestring_ascii
+from numbers import Number
+# Utils.
+from utils import _IMMUTABLE
+
+'''
+Buffered csv and JSON output used by Grid.save, Grid.saveIter and Grid.toJson. Rows are formatted in chunks, column by
+column, into a single string that is written at once, optionally compressed (gzip/bz2), to a file or any file-like object.
+'''
+
+_JSON_BOOLS = {True:'true',False:'false'}
+# float reprs that are not valid JSON numbers, written as json.dumps does.
+_JSON_FLOATS = {'nan':'NaN','inf':'Infinity','-inf':'-Infinity'}
+
+def _formatColumn(column,listSep):
+	'''
+	Return column values as strings, lists are written as [a;b;c].
+	'''
+	if set(map(type,column)) <= _IMMUTABLE:
+		return map(str,column)
+	return ['['+listSep.join([str(element) for element in value])+']' if isinstance(value,list) else str(value) for value in column]
+
+def formatColumns(columns,sep=',',listSep=';'):
+	'''
+	[Description]
+		Format rows given as columns into csv text.
+	[Arguments]
+		columns (list[list[misc]]): Columns, all of the same length.
+		*sep (str): Element separator.
+		*listSep (str): Separator for elements of lists.
+		->return (str): One line per row, each one ended with a line break.
+	'''
+	if len(columns) == 0 or len(columns[0]) == 0:
+		return ''
+	return '\n'.join(map(sep.join,izip(*[_formatColumn(column,listSep) for column in columns])))+'\n'
+
+def formatRows(rows,sep=',',listSep=';'):
+	'''
+	[Description]
+		Format rows into csv text (see formatColumns). Rows of different lengths are formatted one by one.
+	[Arguments]
+		rows (list[list[misc]]): Rows.
+		*sep (str): Element separator.
+		*listSep (str): Separator for elements of lists.
+		->return (str): One line per row, each one ended with a line break.
+	'''
+	if len(set(map(len,rows))) <= 1:
+		return formatColumns(map(list,zip(*rows)),sep,listSep)
+	return ''.join([formatColumns([[element] for element in row],sep,listSep) for row in rows])
+
+def roundValues(values,precision):
+	'''
+	Return values with numbers (bools excluded) rounded to given precision, as GridRow.round.
+	'''
+	if set(map(type,values)) == set([float]):
+		return [round(value,precision) for value in values]
+	return [round(value,precision) if isinstance(value,Number) and not isinstance(value,bool) else value for value in values]
+
+def jsonKey(field):
+	'''
+	Return JSON object key of a field, followed by a colon.
+	'''
+	return json.dumps(field if isinstance(field,basestring) else str(field))+':'
+
+def jsonColumn(column):
+	'''
+	[Description]
+		Return the JSON text of each value of a column (same as json.dumps). Columns with a single type of values are encoded
+		at once with the string conversion of their type, the rest value by value.
+	[Arguments]
+		column (list[misc]): Column values.
+		->return (list[str]): JSON values.
+	'''
+	types = set(map(type,column))
+	if types == set([float]):
+		texts = map(repr,column)
+		if not frozenset(_JSON_FLOATS).isdisjoint(texts):
+			texts = [_JSON_FLOATS.get(text,text) for text in texts]
+		return texts
+	if types <= set([int,long]):
+		return map(str,column)
+	if types == set([bool]):
+		return map(_JSON_BOOLS.__getitem__,column)
+	if types == set([str]):
+		return map(encode_basestring_ascii,column)
+	if types == set([type(None)]):
+		return ['null']*len(column)
+	return map(json.dumps,column)
+
+def jsonRecords(fields,columns,sep='\n'):
+	'''
+	[Description]
+		Format rows given as columns into JSON objects, {"field1":value1,"field2":value2,...}.
+	[Arguments]
+		fields (list[str]): Field name of each column.
+		columns (list[list[misc]]): Columns, all of the same length.
+		*sep (str): Separator between objects.
+		->return (str): JSON objects.
+	'''
+	if len(columns) == 0:
+		return ''
+	keyed = [map(jsonKey(field).__add__,jsonColumn(column)) for field,column in izip(fields,columns)]
+	return '{'+('}'+sep+'{').join(map(','.join,izip(*keyed)))+'}'
+
+def writeJson(target,fields,columns,orient='records',ndjson=True,roundFloats=None,compression='infer',chunkSize=10000):
+	'''
+	[Description]
+		Write columns in JSON format, in chunks of rows:
+			records, ndjson		--> One object per line: {"field1":value1,"field2":value2,...}
+			records				--> List of objects: [{"field1":value1,...},{"field1":value1,...},...]
+			columns, ndjson		--> One object per line and field: {"field1":[value1,value2,...]}
+			columns				--> Single object: {"field1":[value1,value2,...],"field2":[value1,value2,...],...}
+	[Arguments]
+		target (str/file): Path to file or file-like object (see Writer).
+		fields (list[str]): Field name of each column.
+		columns (list[list[misc]]): Columns.
+		*orient (str): records/columns.
+		*ndjson (bool): Newline delimited JSON.
+		*roundFloats (int/None): Round numbers to given precision as they are written.
+		*compression (None/str): gzip/bz2 compression (see Writer).
+		*chunkSize (int): Number of rows formatted and written at once.
+	'''
+	nRows = len(columns[0]) if len(columns) > 0 else 0
+	def chunk(column,start):
+		values = column[start:start+chunkSize]
+		return values if roundFloats == None else roundValues(values,roundFloats)
+	with Writer(target,compression) as aFile:
+		if orient == 'records':
+			for start in xrange(0,nRows,chunkSize):
+				text = jsonRecords(fields,[chunk(column,start) for column in columns],'\n' if ndjson else ',\n')
+				if ndjson:
+					aFile.write(text+'\n')
+				else:
+					aFile.write(('[' if start == 0 else ',\n')+text)
+			if not ndjson:
+				aFile.write(']\n' if nRows > 0 and len(columns) > 0 else '[]\n')
+		elif orient == 'columns':
+			for i,(field,column) in enumerate(izip(fields,columns)):
+				aFile.write(('{' if ndjson or i == 0 else ',\n')+jsonKey(field)+'[')
+				for start in xrange(0,nRows,chunkSize):
+					aFile.write((',' if start > 0 else '')+','.join(jsonColumn(chunk(column,start))))
+				aFile.write(']}\n' if ndjson else ']')
+			if not ndjson:
+				aFile.write('}\n' if len(columns) > 0 else '{}\n')
+		else:
+			raise ValueError('ERROR [writer|writeJson]: Unknown orient '+str(orient))
+
+class Writer(object):
+	'''
+	Text writer to a file path or file-like object (anything with a write method: files, sockets, pipes, StringIO...),
+	optionally compressing the output. Use as a context manager:
+		with Writer(path,'gzip') as f:
+			f.write(text)
+	Files opened from a path are closed on exit, given file-like objects are only flushed (if they can be).
+	'''
+	def __init__(self,target,compression='infer'):
+		'''
+		[Arguments]
+			target (str/file): Path to file or file-like object.
+			*compression (None/str): gzip/bz2. Set to 'infer' to compress files whose path ends with .gz or .bz2.
+		'''
+		if compression == 'infer':
+			compression = None
+			if type(target) == str:
+				if target.endswith('.gz'):
+					compression = 'gzip'
+				elif target.endswith('.bz2'):
+					compression = 'bz2'
+		if compression == 'gzip':
+			self._compressor = zlib.compressobj(6,zlib.DEFLATED,16+zlib.MAX_WBITS)
+		elif compression == 'bz2':
+			self._compressor = bz2.BZ2Compressor()
+		elif compression == None:
+			self._compressor = None
+		else:
+			raise ValueError('ERROR [Writer]: Unknown compression '+str(compression))
+		self._owned = type(target) == str
+		self._file = open(target,'wb') if self._owned else target
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,excType,excValue,traceback):
+		self.close()
+
+	def write(self,text):
+		'''
+		Write text.
+		'''
+		if self._compressor != None:
+			text = self._compressor.compress(text)
+		if len(text) > 0:
+			self._file.write(text)
+
+	def close(self):
+		'''
+		Finish compressed stream and close file (or flush file-like object).
+		'''
+		if self._compressor != None:
+			self._file.write(self._compressor.flush())
+			self._compressor = None
+		if self._owned:
+			self._file.close()
+		elif hasattr(self._file,'flush'):
+			self._file.flush()